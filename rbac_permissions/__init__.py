@@ -0,0 +1 @@
+default_app_config = 'rbac_permissions.apps.RbacPermissionsConfig'
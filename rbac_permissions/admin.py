@@ -5,76 +5,105 @@ import json
 
 from django import forms
 
-from django.conf import settings
+from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
-from django.contrib.admin.widgets import FilteredSelectMultiple
 from django.contrib.postgres.fields import jsonb
 
-from .constants import DJANGO_JSON_WIDGET
 from .models import Role, Transaction, RoleMembership
 from .helpers import get_all_urls_with_names
+from .operations import get_operations
+from .views import AutocompleteJsonView
+from .widgets import (
+    AutocompleteSelectMultiple,
+    PreloadedForeignKeyRawIdWidget,
+    get_json_editor_widget,
+)
 
 
-# Get the generic User model
-User = get_user_model()
 # Unregister the Group admin
 admin.site.unregister(Group)
 
 
-try:
-    from django_json_widget import widgets
-    JSONEditorWidget = widgets.JSONEditorWidget
-except ImportError:
-    JSONEditorWidget = forms.Textarea
-finally:
-    INSTALLED_APPS = getattr(settings, 'INSTALLED_APPS', None)
-    if DJANGO_JSON_WIDGET not in INSTALLED_APPS:
-        JSONEditorWidget = forms.Textarea
-
-
 # Form classes
 class RoleAdminForm(forms.ModelForm):
     class Meta:
         model = Role
         exclude = ()
 
+    # the queryset is set when the form is instantiated,
+    # so that the User model is not needed at import time
     users = forms.ModelMultipleChoiceField(
-        queryset=User.objects.all(),
+        queryset=None,
         required=False,
-        widget=FilteredSelectMultiple('users', False)
+        widget=AutocompleteSelectMultiple(
+            'admin:rbac_permissions_role_users_autocomplete'
+        )
     )
 
     permissions = forms.ModelMultipleChoiceField(
-        queryset=Permission.objects.all(),
+        queryset=Permission.objects.select_related('content_type'),
         required=False,
-        widget=FilteredSelectMultiple('permissions', False)
+        widget=AutocompleteSelectMultiple(
+            'admin:rbac_permissions_role_permissions_autocomplete'
+        )
     )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['users'].queryset = get_user_model().objects.all()
+        # only the primary keys are needed, the widgets fetch the labels
+        # of the selected objects themselves
+        self.initial_user_ids = set()
+        self.initial_permission_ids = set()
         if self.instance.pk:
-            self.fields['users'].initial = self.instance.user_set.all()
-            self.fields['permissions'].initial = (
-                self.instance.permissions.all()
+            self.initial_user_ids = set(
+                self.instance.user_set.values_list('pk', flat=True)
+            )
+            self.initial_permission_ids = set(
+                self.instance.permissions.values_list('pk', flat=True)
             )
+        self.fields['users'].initial = list(self.initial_user_ids)
+        self.fields['permissions'].initial = list(
+            self.initial_permission_ids
+        )
 
     def save_m2m(self):
-        self.instance.user_set.set(self.cleaned_data['users'])
+        # apply the membership edits as diffs against the initial state
+        if 'users' in self.changed_data:
+            user_ids = set(
+                self.cleaned_data['users'].values_list('pk', flat=True)
+            )
+            self.instance.user_set.remove(
+                *(self.initial_user_ids - user_ids)
+            )
+            self.instance.user_set.add(*(user_ids - self.initial_user_ids))
+            self.initial_user_ids = user_ids
 
         cleaned_permissions = self.cleaned_data['permissions']
 
-        if cleaned_permissions:
-            self.instance.group_ptr.permissions.set(cleaned_permissions)
+        if cleaned_permissions and 'permissions' in self.changed_data:
+            permission_ids = set(
+                cleaned_permissions.values_list('pk', flat=True)
+            )
+            self.instance.permissions.remove(
+                *(self.initial_permission_ids - permission_ids)
+            )
+            self.instance.permissions.add(
+                *(permission_ids - self.initial_permission_ids)
+            )
+            self.initial_permission_ids = permission_ids
             # if has any children (senior roles), set permissions for them
             children = self.instance.children.all()
             for child in children:
-                child.group_ptr.permissions.set(cleaned_permissions)
+                child.permissions.set(permission_ids)
 
-    def save(self, *args, **kwargs):
+    def save(self, commit=True):
         instance = self.instance.save()
-        self.save_m2m()
+        # the admin saves the relations itself within save_related
+        if commit:
+            self.save_m2m()
         return instance
 
 
@@ -82,7 +111,9 @@ class TransactionAdminForm(forms.ModelForm):
     paths = forms.MultipleChoiceField(
         choices=[],
         required=False,
-        widget=forms.CheckboxSelectMultiple()
+        widget=AutocompleteSelectMultiple(
+            'admin:rbac_permissions_transaction_paths_autocomplete'
+        )
     )
 
     def __init__(self, *args, **kwargs):
@@ -96,11 +127,42 @@ class TransactionAdminForm(forms.ModelForm):
         exclude = ()
 
 
+class RoleMembershipInlineForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # label the raw id fields with the objects loaded by the inline's
+        # queryset, so that no query is made per rendered membership
+        for field_name in ('transaction', 'permission'):
+            widget = self.fields[field_name].widget
+            if isinstance(widget, PreloadedForeignKeyRawIdWidget):
+                widget.related_object = getattr(self.instance, field_name)
+
+    class Meta:
+        model = RoleMembership
+        exclude = ()
+
+
 # Admin Classes
 class RoleMembershipInline(admin.TabularInline):
     model = RoleMembership
+    form = RoleMembershipInlineForm
     raw_id_fields = ('transaction', 'permission')
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.select_related('role', 'permission__content_type',
+                                       'transaction')
+
+    def formfield_for_foreignkey(self, db_field, request=None, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request,
+                                                     **kwargs)
+        if db_field.name in self.raw_id_fields:
+            formfield.widget = PreloadedForeignKeyRawIdWidget(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            )
+        return formfield
+
 
 class RoleAdmin(admin.ModelAdmin):
     form = RoleAdminForm
@@ -108,27 +170,63 @@ class RoleAdmin(admin.ModelAdmin):
     list_display = ('name', )
     inlines = [RoleMembershipInline, ]
 
+    def get_urls(self):
+        User = get_user_model()
+        info = self.model._meta.app_label, self.model._meta.model_name
+        users_view = AutocompleteJsonView.as_view(
+            model_admin=self,
+            queryset=User.objects.all(),
+            search_fields=(User.USERNAME_FIELD, )
+        )
+        permissions_view = AutocompleteJsonView.as_view(
+            model_admin=self,
+            queryset=Permission.objects.select_related('content_type'),
+            search_fields=('codename', 'name')
+        )
+        urlpatterns = [
+            url(r'^autocomplete/users/$',
+                self.admin_site.admin_view(users_view),
+                name='%s_%s_users_autocomplete' % info),
+            url(r'^autocomplete/permissions/$',
+                self.admin_site.admin_view(permissions_view),
+                name='%s_%s_permissions_autocomplete' % info),
+        ]
+        return urlpatterns + super().get_urls()
+
 
 class TransactionAdmin(admin.ModelAdmin):
-    formfield_overrides = {
-        jsonb.JSONField: {
-            'widget': JSONEditorWidget
-        }
-    }
     form = TransactionAdminForm
 
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        # the optional JSON editor is resolved on the first rendered form
+        if isinstance(db_field, jsonb.JSONField):
+            kwargs.setdefault('widget', get_json_editor_widget())
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        paths_view = AutocompleteJsonView.as_view(
+            model_admin=self,
+            choices=get_all_urls_with_names
+        )
+        urlpatterns = [
+            url(r'^autocomplete/paths/$',
+                self.admin_site.admin_view(paths_view),
+                name='%s_%s_paths_autocomplete' % info),
+        ]
+        return urlpatterns + super().get_urls()
+
     def save_model(self, request, obj, form, change):
         if 'paths' in form.changed_data:
-            db_instance = Transaction.objects.get(pk=obj.pk)
-            added_paths = set(obj.paths) - set(db_instance.paths)
+            # the form's initial data holds the stored paths
+            initial_paths = form.initial.get('paths') or []
+            added_paths = set(obj.paths) - set(initial_paths)
 
+            # add an empty rule for each operation of the request methods
+            operations = get_operations()
             rules_to_add = {
-                path_name: {
-                    'create': [],
-                    'read': [],
-                    'update': [],
-                    'delete': []
-                } for path_name in added_paths
+                path_name: {operation: [] for operation in operations}
+                for path_name in added_paths
             }
             rules = obj.rules
             if isinstance(rules, str):
@@ -1,8 +1,57 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import time
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_started
+
+from .constants import DEFAULT_POLICY_WARM_UP, POLICY_WARM_UP_MODES
 
 
 class RbacPermissionsConfig(AppConfig):
     name = 'rbac_permissions'
+
+    def ready(self):
+        """
+        Validates the settings and optionally schedules the policy warm up.
+
+        Nothing else is done here, in particular no database or cache access,
+        since ready runs for every management command as well. The optional
+        parts (the admin widgets, the JSON editor, etc..) are imported when
+        they are first used.
+        """
+
+        # the durations of the startup steps in seconds by their names
+        self.startup_timings = {}
+        started_at = time.perf_counter()
+
+        # validate the request method policy before the first request
+        from .operations import (
+            get_request_method_operations,
+            get_unchecked_request_methods,
+        )
+        get_request_method_operations()
+        get_unchecked_request_methods()
+
+        POLICY_WARM_UP = getattr(settings, 'POLICY_WARM_UP',
+                                 DEFAULT_POLICY_WARM_UP)
+        if (POLICY_WARM_UP is not None and
+                POLICY_WARM_UP not in POLICY_WARM_UP_MODES):
+            raise ImproperlyConfigured(
+                'POLICY_WARM_UP must be one of {} or None.'.format(
+                    ', '.join(POLICY_WARM_UP_MODES))
+            )
+        self.startup_timings['settings_validation'] = (
+            time.perf_counter() - started_at
+        )
+
+        if POLICY_WARM_UP is not None:
+            from .warmup import warm_up_on_first_request
+            request_started.connect(
+                warm_up_on_first_request,
+                dispatch_uid='rbac_permissions_warm_up'
+            )
+
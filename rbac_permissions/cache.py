@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .constants import (
+    DEFAULT_NEGATIVE_RESULT_CACHE_ALIAS,
+    DEFAULT_NEGATIVE_RESULT_CACHE_TIMEOUT,
+)
+
+
+class NegativeResultCache(object):
+    """
+    Remembers lookups which did not find anything, such as url names which
+    do not belong to any Transaction.
+
+    The cached keys are versioned with a generation number, which is stored
+    in the cache as well. Invalidating the cache increments the generation,
+    so that every process sharing the cache backend stops seeing the old
+    results at once.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        # the generation of this process, if the cache doesn't keep it
+        self.local_generation = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        alias = getattr(settings, 'NEGATIVE_RESULT_CACHE_ALIAS',
+                        DEFAULT_NEGATIVE_RESULT_CACHE_ALIAS)
+        return caches[alias]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'NEGATIVE_RESULT_CACHE_TIMEOUT',
+                       DEFAULT_NEGATIVE_RESULT_CACHE_TIMEOUT)
+
+    @property
+    def generation_key(self):
+        return '{}:generation'.format(self.prefix)
+
+    def new_generation(self):
+        # start from the current time, so that the versions of the results
+        # cached before the generation got evicted are never reused
+        return int(time.time() * 1000)
+
+    def get_generation(self):
+        cache = self.cache
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            cache.add(self.generation_key, self.new_generation(), None)
+            generation = cache.get(self.generation_key)
+        if generation is None:
+            # the cache doesn't keep anything (e.g. DummyCache), so keep a
+            # generation within this process, which only changes when this
+            # process invalidates the cache
+            with self._lock:
+                if self.local_generation is None:
+                    self.local_generation = self.new_generation()
+                generation = self.local_generation
+        return generation
+
+    def make_key(self, name):
+        return '{}:{}'.format(self.prefix, name)
+
+    def contains(self, name, generation=None):
+        """
+        Checks if the lookup of the given name is known to find nothing.
+
+        Args:
+            name (str): the looked up name. (url name, codename, etc..)
+            generation (int): the current generation. If None, it is read
+                               from the cache, so pass the result of
+                               get_generation to reuse it within a check.
+
+        Returns:
+            (bool): True if the name is cached as nonexistent.
+        """
+
+        if generation is None:
+            generation = self.get_generation()
+        is_cached = self.cache.get(self.make_key(name),
+                                   version=generation) is not None
+        with self._lock:
+            if is_cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return is_cached
+
+    def add(self, name, generation=None):
+        """Caches the given name as nonexistent."""
+        if generation is None:
+            generation = self.get_generation()
+        self.cache.set(self.make_key(name), True, self.timeout,
+                       version=generation)
+
+    def invalidate(self):
+        """Drops all the cached names of this cache."""
+        with self._lock:
+            if self.local_generation is not None:
+                self.local_generation += 1
+        try:
+            self.cache.incr(self.generation_key)
+        except ValueError:
+            # the generation has been evicted, so start a new one
+            self.cache.set(self.generation_key, self.new_generation(), None)
+
+    def get_stats(self):
+        """
+        Returns:
+            (dict): the number of hits and misses within this process.
+        """
+
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+# url names which are not added to any Transaction
+unmapped_paths = NegativeResultCache('rbac_permissions:unmapped_path')
+# permission codenames which do not exist
+missing_permissions = NegativeResultCache(
+    'rbac_permissions:missing_permission'
+)
+
+
+def get_negative_result_cache_stats():
+    """
+    Returns:
+        (dict): hits and misses of each negative result cache.
+    """
+
+    return {
+        'unmapped_paths': unmapped_paths.get_stats(),
+        'missing_permissions': missing_permissions.get_stats(),
+    }
@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 
 from .constants import DEFAULT_ROLE_RULE_DENIED_ACCESS_MESSAGE
 from .helpers import is_user_permitted
+from .operations import is_unchecked_method
+from .routing import get_policy_manager, get_policy_routing
 
 
 class GroupPermission(permissions.BasePermission):
@@ -31,15 +33,22 @@ class GroupPermission(permissions.BasePermission):
         if request.user.is_superuser:
             return True
 
+        # the unchecked methods (e.g. CORS preflights) are always granted
+        if is_unchecked_method(request.method.lower()):
+            return True
+
         # prepare the url name
         url_name = request.resolver_match.url_name
 
+        # all the policy reads of the request use the same database
+        routing = get_policy_routing()
+
         # if the user is anonymous, try to fetch it from query parameters
         user_id = (request.GET.get('rbac_user')
                    if request.user.is_anonymous else None)
         if user_id:
             User = get_user_model()
-            user = User.objects.get(id=user_id)
+            user = get_policy_manager(User, routing).get(id=user_id)
         else:
             user = request.user
 
@@ -53,7 +62,8 @@ class GroupPermission(permissions.BasePermission):
                 user,
                 group_required,
                 url_name,
-                request.method.lower()
+                request.method.lower(),
+                routing
             )
             is_permitted |= user_permitted
             is_group_in_tree |= is_in_tree
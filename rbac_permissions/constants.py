@@ -1,15 +1,25 @@
 REQUEST_METHODS_TO_CRUD_OPERATIONS = {
     'get': 'read',
+    'head': 'read',
     'post': 'create',
     'put': 'update',
+    'patch': 'update',
     'delete': 'delete'
 }
+# Overrides of the mapping above, e.g. {'patch': 'partial_update'}
+DEFAULT_REQUEST_METHOD_OPERATIONS = {}
+# Requests with these methods (e.g. CORS preflights) are always granted
+# without checking the policy
+DEFAULT_UNCHECKED_REQUEST_METHODS = ('options', )
 
 DEFAULT_REQUEST_METHOD = 'get'
 DEFAULT_URLCONF = 'ROOT_URLCONF'
 DEFAULT_ADMIN_PERMISSION_NAME = 'admin'
 DEFAULT_ADMIN_URL = '/admin/'
 DEFAULT_ADMIN_URL_NAME = 'admin:index'
+# The url namespaces, whose requests are checked by the middleware.
+# The root namespace is ''.
+DEFAULT_ENFORCED_URL_NAMESPACES = ()
 DEFAULT_PERMISSION_DENIED_URL = 'permission-denied'
 # Determines whether to give access to a nonexistent path
 # nonexistent path = a path which is not added to an existing Transaction
@@ -25,5 +35,37 @@ DEFAULT_ROLE_RULE_DENIED_ACCESS_MESSAGE = (
 
 ALLOW_ALL_ROLES_SYMBOL = '*'
 
+# The cache, which holds the url names without a Transaction and the
+# nonexistent permission codenames, and the timeout of its entries in seconds
+DEFAULT_NEGATIVE_RESULT_CACHE_ALIAS = 'default'
+DEFAULT_NEGATIVE_RESULT_CACHE_TIMEOUT = 300
+
+# The cache, which records the recent policy changes, and the number of
+# seconds the policy reads stick to the primary database after a change
+DEFAULT_POLICY_ROUTING_CACHE_ALIAS = 'default'
+DEFAULT_POLICY_WRITE_STICKINESS = 5
+# Whether the policy reads pass hints to the database routers, when
+# POLICY_READ_DATABASE is not set
+DEFAULT_POLICY_ROUTER_HINTS = False
+
+# Number of results returned per page by the admin autocomplete views
+DEFAULT_AUTOCOMPLETE_PAGE_SIZE = 20
+
+# Number of users fetched by each query of the access matrix export
+DEFAULT_ACCESS_MATRIX_CHUNK_SIZE = 1000
+DEFAULT_ACCESS_MATRIX_MAX_ROLE_SETS = 1000
+ACCESS_MATRIX_FORMATS = ('csv', 'jsonl')
+
+# Load test defaults
+LOAD_TEST_MODES = ('threads', 'processes')
+DEFAULT_LOAD_TEST_USER_COUNT = 100
+DEFAULT_LOAD_TEST_MONITOR_INTERVAL = 0.1
+
+# Preloads the policy on the first request of each process: None disables
+# it, 'first_request' preloads it before the request is handled and
+# 'background' preloads it in a thread
+DEFAULT_POLICY_WARM_UP = None
+POLICY_WARM_UP_MODES = ('first_request', 'background')
+
 # Optional 3rd party package names
 DJANGO_JSON_WIDGET = 'django_json_widget'
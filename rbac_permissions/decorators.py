@@ -11,19 +11,34 @@ from .constants import (
     DEFAULT_PERMISSION_DENIED_URL
 )
 from .helpers import is_user_permitted
+from .operations import is_unchecked_method
+from .routing import get_policy_manager, get_policy_routing
 
 
-ROLE_RULE_DENIED_ACCESS_MESSAGE = getattr(
-    settings, 'ROLE_RULE_DENIED_ACCESS_MESSAGE',
-    DEFAULT_ROLE_RULE_DENIED_ACCESS_MESSAGE
-)
-HTTP_FORBIDDEN_MESSAGE = getattr(
-    settings, 'HTTP_FORBIDDEN_MESSAGE', DEFAULT_HTTP_FORBIDDEN_MESSAGE
-)
+# the module level settings with their defaults, which are read lazily
+LAZY_SETTINGS = {
+    'ROLE_RULE_DENIED_ACCESS_MESSAGE': DEFAULT_ROLE_RULE_DENIED_ACCESS_MESSAGE,
+    'HTTP_FORBIDDEN_MESSAGE': DEFAULT_HTTP_FORBIDDEN_MESSAGE,
+    'PERMISSION_DENIED_URL': DEFAULT_PERMISSION_DENIED_URL,
+}
 
-PERMISSION_DENIED_URL = getattr(
-    settings, 'PERMISSION_DENIED_URL', DEFAULT_PERMISSION_DENIED_URL
-)
+
+def get_lazy_setting(name):
+    return getattr(settings, name, LAZY_SETTINGS[name])
+
+
+def __getattr__(name):
+    """
+    Reads ROLE_RULE_DENIED_ACCESS_MESSAGE, HTTP_FORBIDDEN_MESSAGE and
+    PERMISSION_DENIED_URL from the settings when they are accessed, instead
+    of when this module is imported.
+    """
+
+    if name in LAZY_SETTINGS:
+        return get_lazy_setting(name)
+    raise AttributeError(
+        'module {} has no attribute {}'.format(__name__, name)
+    )
 
 
 def user_groups_required(groups_required=None):
@@ -42,12 +57,19 @@ def user_groups_required(groups_required=None):
             # get the passed required user group/role names
             groups_required = kwargs.pop('groups_required')
 
+            # the unchecked methods (e.g. CORS preflights) are always granted
+            if is_unchecked_method(request.method.lower()):
+                return view_func(*args, **kwargs)
+
+            # all the policy reads of the request use the same database
+            routing = get_policy_routing()
+
             # if the user is anonymous, try to fetch it from query parameters
             user_id = (request.GET.get('rbac_user')
                        if request.user.is_anonymous else None)
             if user_id:
                 User = get_user_model()
-                user = User.objects.get(id=user_id)
+                user = get_policy_manager(User, routing).get(id=user_id)
             else:
                 user = request.user
 
@@ -57,17 +79,20 @@ def user_groups_required(groups_required=None):
             for group_required in groups_required:
                 user_permitted, is_in_tree = is_user_permitted(
                     user, group_required, url_name,
-                    request.method.lower())
+                    request.method.lower(), routing)
                 is_permitted |= user_permitted
                 is_group_in_tree |= is_in_tree
 
             if not is_permitted:
+                # the settings are read here instead of at import time
                 if is_group_in_tree:
-                    message = ROLE_RULE_DENIED_ACCESS_MESSAGE
+                    message = get_lazy_setting(
+                        'ROLE_RULE_DENIED_ACCESS_MESSAGE'
+                    )
                 else:
-                    message = HTTP_FORBIDDEN_MESSAGE
+                    message = get_lazy_setting('HTTP_FORBIDDEN_MESSAGE')
 
-                url_name = PERMISSION_DENIED_URL
+                url_name = get_lazy_setting('PERMISSION_DENIED_URL')
                 url = reverse(url_name) + '?message={}'.format(message)
                 # redirect to the defined permission denied view
                 return HttpResponseRedirect(url)
@@ -0,0 +1,400 @@
+import copy
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction as db_transaction
+from django.test.utils import override_settings
+
+from .constants import ALLOW_ALL_ROLES_SYMBOL
+from .helpers import is_user_permitted
+from .lookups import get_permitted_users
+from .models import Role, RoleMembership, Transaction
+
+
+# url names, some of which contain each other, to exercise the
+# substring lookups of the paths
+DIFFERENTIAL_URL_NAMES = ('item', 'item-list', 'item-detail', 'order-list')
+# 'trace' has no operation and 'options' is not checked
+DIFFERENTIAL_METHODS = ('get', 'head', 'post', 'put', 'patch', 'delete',
+                        'options', 'trace')
+DIFFERENTIAL_OPERATIONS = ('read', 'create', 'update', 'delete')
+# prefixes all the generated names, so that they don't collide with
+# the other objects of the test database
+DIFFERENTIAL_NAME_PREFIX = 'differential-'
+# a role name, which is never created
+UNKNOWN_ROLE_NAME = DIFFERENTIAL_NAME_PREFIX + 'unknown'
+
+
+def make_name(kind, index):
+    return '{}{}{}'.format(DIFFERENTIAL_NAME_PREFIX, kind, index)
+
+
+def reverse_lookup_engine(user, group_required, url_name, method):
+    """Decides the access with the reverse lookups of lookups.py."""
+    users = get_permitted_users(url_name, method, group_required)
+    return users.filter(pk=user.pk).exists()
+
+
+DEFAULT_ENGINES = {
+    'reverse_lookup': reverse_lookup_engine,
+}
+
+
+def generate_policy(rng, share_transaction_names=True):
+    """
+    Generates a random policy.
+
+    A policy is a plain dict, which describes the roles, the plain groups
+    without a role, the transactions, memberships and users to create,
+    and the requests to check.
+
+    Some transactions may share their names, in which case the memberships
+    of different roles hold different rules of the same permission. Then
+    is_user_permitted depends on the order of the user's groups, which the
+    reverse lookups can't follow.
+
+    Args:
+        rng (random.Random): the random number generator.
+        share_transaction_names (bool): whether the transactions may share
+                                        their names.
+
+    Returns:
+        (dict): the generated policy.
+    """
+
+    roles = []
+    for index in range(rng.randint(1, 5)):
+        parent = rng.choice(roles)['name'] if (
+            roles and rng.random() < 0.6) else None
+        roles.append({'name': make_name('role', index), 'parent': parent})
+    role_names = [role['name'] for role in roles]
+    group_names = [make_name('group', index)
+                   for index in range(rng.randint(0, 2))]
+
+    def random_allowed_roles():
+        candidates = role_names + group_names + [ALLOW_ALL_ROLES_SYMBOL,
+                                                 UNKNOWN_ROLE_NAME]
+        return rng.sample(candidates, rng.randint(0, min(3, len(candidates))))
+
+    transactions = []
+    for index in range(rng.randint(0, 3)):
+        paths = rng.sample(DIFFERENTIAL_URL_NAMES,
+                           rng.randint(1, len(DIFFERENTIAL_URL_NAMES)))
+        rules = {}
+        for path in paths:
+            if rng.random() < 0.2:
+                continue
+            # an empty rule grants access just like a missing rule
+            rules[path] = {} if rng.random() < 0.1 else {
+                operation: random_allowed_roles()
+                for operation in DIFFERENTIAL_OPERATIONS
+                if rng.random() < 0.9
+            }
+        is_shared = rng.random() < 0.3 and share_transaction_names
+        name = rng.choice(transactions)['name'] if (
+            transactions and is_shared) else make_name('transaction', index)
+        transactions.append({
+            'key': index,
+            'name': name,
+            'paths': paths,
+            'rules': rules,
+            'has_permission': rng.random() < 0.8,
+        })
+
+    memberships = [
+        [role_name, transaction['key']]
+        for role_name in role_names
+        for transaction in transactions
+        if rng.random() < 0.5
+    ]
+
+    users = [
+        {
+            'username': make_name('user', index),
+            'roles': rng.sample(role_names,
+                                rng.randint(0, min(2, len(role_names)))),
+            'groups': rng.sample(group_names,
+                                 rng.randint(0, len(group_names))),
+            'is_superuser': rng.random() < 0.1,
+        } for index in range(rng.randint(1, 4))
+    ]
+
+    requests = [
+        [
+            rng.choice(users)['username'],
+            rng.choice(role_names + group_names + [UNKNOWN_ROLE_NAME]),
+            rng.choice(DIFFERENTIAL_URL_NAMES),
+            rng.choice(DIFFERENTIAL_METHODS),
+        ] for _ in range(rng.randint(1, 12))
+    ]
+
+    return {
+        'roles': roles,
+        'groups': group_names,
+        'transactions': transactions,
+        'memberships': memberships,
+        'users': users,
+        'requests': requests,
+        'grant_nonexistent_path_access': rng.random() < 0.5,
+    }
+
+
+def create_policy(policy):
+    """
+    Creates the objects of the given policy.
+
+    Returns:
+        (dict): the created User instances by their usernames.
+    """
+
+    User = get_user_model()
+    content_type = ContentType.objects.first()
+    roles = {}
+    transactions = {}
+    users = {}
+
+    for role in policy['roles']:
+        parent = roles.get(role['parent'])
+        roles[role['name']] = Role(name=role['name'], parent=parent).save()
+
+    groups = {name: Group.objects.create(name=name)
+              for name in policy['groups']}
+
+    for transaction in policy['transactions']:
+        transactions[transaction['key']] = Transaction.objects.create(
+            name=transaction['name'],
+            paths=transaction['paths'],
+            rules=transaction['rules']
+        )
+        if transaction['has_permission']:
+            Permission.objects.get_or_create(
+                codename=transaction['name'],
+                defaults={'name': transaction['name'],
+                          'content_type': content_type}
+            )
+
+    for role_name, transaction_key in policy['memberships']:
+        RoleMembership.objects.create(
+            role=roles[role_name],
+            transaction=transactions[transaction_key]
+        )
+
+    for user in policy['users']:
+        instance = User.objects.create(
+            is_superuser=user['is_superuser'],
+            **{User.USERNAME_FIELD: user['username']}
+        )
+        instance.groups.set(
+            [roles[name] for name in user['roles']] +
+            [groups[name] for name in user['groups']]
+        )
+        users[user['username']] = instance
+
+    return users
+
+
+def find_mismatches(policy, engines):
+    """
+    Creates the policy within a rolled back transaction and compares the
+    decisions of the engines with helpers.is_user_permitted.
+
+    Args:
+        policy (dict): the policy to check.
+        engines (dict): the engines to compare by their names.
+
+    Returns:
+        (list): (engine name, request, expected, actual) tuples.
+    """
+
+    mismatches = []
+    grant_nonexistent_path_access = policy['grant_nonexistent_path_access']
+
+    with override_settings(
+            GRANT_NONEXISTENT_PATH_ACCESS=grant_nonexistent_path_access):
+        with db_transaction.atomic():
+            users = create_policy(policy)
+            for request in policy['requests']:
+                username, group_required, url_name, method = request
+                user = users[username]
+                expected, _ = is_user_permitted(user, group_required,
+                                                url_name, method)
+                for engine_name, engine in engines.items():
+                    actual = engine(user, group_required, url_name, method)
+                    if bool(actual) != bool(expected):
+                        mismatches.append(
+                            (engine_name, request, expected, actual)
+                        )
+            db_transaction.set_rollback(True)
+
+    return mismatches
+
+
+def remove_role(policy, role_name):
+    policy['roles'] = [role for role in policy['roles']
+                       if role['name'] != role_name]
+    for role in policy['roles']:
+        if role['parent'] == role_name:
+            role['parent'] = None
+    policy['memberships'] = [membership
+                             for membership in policy['memberships']
+                             if membership[0] != role_name]
+    for user in policy['users']:
+        user['roles'] = [name for name in user['roles'] if name != role_name]
+
+
+def iter_shrunk_policies(policy):
+    """
+    Yields:
+        (dict): the policies, which are one step smaller than the given one.
+    """
+
+    for index in range(len(policy['requests'])):
+        shrunk = copy.deepcopy(policy)
+        del shrunk['requests'][index]
+        yield shrunk
+
+    requested_usernames = {request[0] for request in policy['requests']}
+    for index, user in enumerate(policy['users']):
+        if user['username'] not in requested_usernames:
+            shrunk = copy.deepcopy(policy)
+            del shrunk['users'][index]
+            yield shrunk
+
+    for index in range(len(policy['memberships'])):
+        shrunk = copy.deepcopy(policy)
+        del shrunk['memberships'][index]
+        yield shrunk
+
+    for index, transaction in enumerate(policy['transactions']):
+        shrunk = copy.deepcopy(policy)
+        del shrunk['transactions'][index]
+        shrunk['memberships'] = [membership
+                                 for membership in shrunk['memberships']
+                                 if membership[1] != transaction['key']]
+        yield shrunk
+
+    for name in policy['groups']:
+        shrunk = copy.deepcopy(policy)
+        shrunk['groups'].remove(name)
+        for user in shrunk['users']:
+            user['groups'] = [group_name for group_name in user['groups']
+                              if group_name != name]
+        yield shrunk
+
+    for role in policy['roles']:
+        shrunk = copy.deepcopy(policy)
+        remove_role(shrunk, role['name'])
+        yield shrunk
+
+    for index, role in enumerate(policy['roles']):
+        if role['parent'] is not None:
+            shrunk = copy.deepcopy(policy)
+            shrunk['roles'][index]['parent'] = None
+            yield shrunk
+
+    for index, user in enumerate(policy['users']):
+        for role_name in user['roles']:
+            shrunk = copy.deepcopy(policy)
+            shrunk['users'][index]['roles'].remove(role_name)
+            yield shrunk
+        for group_name in user['groups']:
+            shrunk = copy.deepcopy(policy)
+            shrunk['users'][index]['groups'].remove(group_name)
+            yield shrunk
+        if user['is_superuser']:
+            shrunk = copy.deepcopy(policy)
+            shrunk['users'][index]['is_superuser'] = False
+            yield shrunk
+
+    for index, transaction in enumerate(policy['transactions']):
+        if len(transaction['paths']) > 1:
+            for path in transaction['paths']:
+                shrunk = copy.deepcopy(policy)
+                shrunk_transaction = shrunk['transactions'][index]
+                shrunk_transaction['paths'].remove(path)
+                shrunk_transaction['rules'].pop(path, None)
+                yield shrunk
+        for path, rule in transaction['rules'].items():
+            shrunk = copy.deepcopy(policy)
+            del shrunk['transactions'][index]['rules'][path]
+            yield shrunk
+            for operation, allowed_roles in rule.items():
+                for role_name in allowed_roles:
+                    shrunk = copy.deepcopy(policy)
+                    shrunk['transactions'][index]['rules'][path][
+                        operation].remove(role_name)
+                    yield shrunk
+
+
+def shrink_policy(policy, engine_name, engine):
+    """
+    Shrinks a policy, for which the given engine disagrees with
+    helpers.is_user_permitted, as long as the disagreement remains.
+
+    Returns:
+        (dict): a minimal policy, which still has a mismatch.
+    """
+
+    engines = {engine_name: engine}
+    is_shrunk = True
+
+    while is_shrunk:
+        is_shrunk = False
+        for shrunk in iter_shrunk_policies(policy):
+            if shrunk['requests'] and find_mismatches(shrunk, engines):
+                policy = shrunk
+                is_shrunk = True
+                break
+
+    return policy
+
+
+def run_differential_check(engines=None, examples=100, seed=None,
+                           share_transaction_names=True):
+    """
+    Compares the engines with helpers.is_user_permitted, which is the
+    reference, on randomly generated policies.
+
+    The checked policies are created within rolled back transactions, but
+    their saves still send the signals, which invalidate the shared caches.
+    So only run the check from a TestCase, against the test database.
+
+    Args:
+        engines (dict): the engines to compare by their names. An engine is
+                        a callable with the signature of is_user_permitted,
+                        which returns whether the user is permitted.
+                        Defaults to DEFAULT_ENGINES.
+        examples (int): the number of generated policies.
+        seed (int): the seed of the random number generator.
+        share_transaction_names (bool): whether the generated transactions
+                                        may share their names.
+
+    Returns:
+        (list): a (engine name, minimal policy, mismatches) tuple for each
+                engine, which disagreed with the reference.
+    """
+
+    if engines is None:
+        engines = DEFAULT_ENGINES
+
+    rng = random.Random(seed)
+    counterexamples = []
+    remaining_engines = dict(engines)
+
+    for _ in range(examples):
+        if not remaining_engines:
+            break
+        policy = generate_policy(rng, share_transaction_names)
+        mismatches = find_mismatches(policy, remaining_engines)
+        for engine_name in {mismatch[0] for mismatch in mismatches}:
+            engine = remaining_engines.pop(engine_name)
+            minimal_policy = shrink_policy(policy, engine_name, engine)
+            counterexamples.append((
+                engine_name,
+                minimal_policy,
+                find_mismatches(minimal_policy, {engine_name: engine})
+            ))
+
+    return counterexamples
@@ -8,12 +8,23 @@ from .constants import (
     DEFAULT_REQUEST_METHOD,
     DEFAULT_URLCONF as urlconf,
     DEFAULT_GRANT_NONEXISTENT_PATH_ACCESS,
-    REQUEST_METHODS_TO_CRUD_OPERATIONS,
 )
-from .models import Transaction
+from .cache import missing_permissions, unmapped_paths
+from .models import RoleMembership, Transaction
+from .operations import get_request_method_operations, is_unchecked_method
+from .routing import get_policy_manager, get_policy_routing
 
 
-def is_in_group_tree(user, group_name):
+# the url names of get_all_urls_with_names,
+# as a (root url configuration, url names) tuple
+collected_url_names = (None, None)
+
+# the transactions of get_compiled_transactions, as a (generation,
+# transaction paths, transaction names by url names) tuple
+compiled_transactions = (None, [], {})
+
+
+def is_in_group_tree(user, group_name, routing=None):
     """
     Checks if the given user's group is equal to group_name,
     is a parent of the group_name or a child of the group_name.
@@ -27,6 +38,8 @@ def is_in_group_tree(user, group_name):
     Args:
         user: A User instance.
         group_name: A string of a valid group name.
+        routing (tuple): the policy routing of the check.
+                         Defaults to get_policy_routing().
 
     Returns:
         is_in_group_tree (bool): whether the user group is connected
@@ -36,7 +49,11 @@ def is_in_group_tree(user, group_name):
     is_child = False
     is_equal = False
 
-    groups = user.groups.all()
+    if routing is None:
+        routing = get_policy_routing()
+    groups = get_policy_manager(Group, routing).filter(
+        user=user
+    ).select_related('role')
 
     for group in groups:
         try:
@@ -56,7 +73,8 @@ def is_in_group_tree(user, group_name):
 
 
 def check_user_group_permission(user, permission_name, resolved_path,
-                                request_method=DEFAULT_REQUEST_METHOD):
+                                request_method=DEFAULT_REQUEST_METHOD,
+                                routing=None):
     """
     Checks if the given user is granted the current transaction.
 
@@ -66,6 +84,8 @@ def check_user_group_permission(user, permission_name, resolved_path,
                          it is always related to a module. (offers, etc..)
         resolved_path (str): The basename of the resolved url
         request_method (str): The lowered current request method. (get, etc..)
+        routing (tuple): the policy routing of the check.
+                         Defaults to get_policy_routing().
 
     Returns:
         is_matching_permission (bool): Whether the user is granted the given
@@ -76,16 +96,37 @@ def check_user_group_permission(user, permission_name, resolved_path,
     if user.is_superuser:
         return True
 
+    # the unchecked methods (e.g. CORS preflights) are always granted
+    if is_unchecked_method(request_method):
+        return True
+
+    # the methods without an operation are not granted by any rule
+    operation = get_request_method_operations().get(request_method)
+
+    # nonexistent permissions are cached until a Permission is saved
+    generation = missing_permissions.get_generation()
+    if missing_permissions.contains(permission_name, generation):
+        return True
+
+    if routing is None:
+        routing = get_policy_routing()
+
     # try to get the permission, if it does not exist,
     # just return True since the group has all permissions
     # against a non existent permission.
     try:
-        Permission.objects.get(codename=permission_name)
+        get_policy_manager(Permission, routing).get(codename=permission_name)
     except Permission.DoesNotExist:
+        missing_permissions.add(permission_name, generation)
         return True
 
     is_matching_permission = False
-    groups = user.groups.all()
+    groups = get_policy_manager(Group, routing).filter(
+        user=user
+    ).select_related('role')
+    memberships = get_policy_manager(RoleMembership, routing).select_related(
+        'transaction'
+    )
 
     # for each user group, get her role memberships
     # role memberships are permission holders, holding information about
@@ -94,8 +135,13 @@ def check_user_group_permission(user, permission_name, resolved_path,
              'transaction__paths__contains': resolved_path}
 
     for group in groups:
-        role = group.role
-        role_membership = role.memberships.filter(**query).last()
+        # the groups without a role have no memberships
+        try:
+            role = group.role
+        except Group.role.RelatedObjectDoesNotExist:
+            continue
+
+        role_membership = memberships.filter(role_id=role.pk, **query).last()
         # if there is no related membership for this permission,
         # continue the iteration since we cannot be sure to grant the
         # permission
@@ -119,15 +165,11 @@ def check_user_group_permission(user, permission_name, resolved_path,
 
         # Check if our user's role name is within the defined role's
         # in the request method's rule set
-        allowed_roles = transaction_rule.get(
-            REQUEST_METHODS_TO_CRUD_OPERATIONS.get(request_method)
-        )
+        allowed_roles = transaction_rule.get(operation) or []
         is_matching_permission = (role.name in allowed_roles or
                                   ALLOW_ALL_ROLES_SYMBOL in allowed_roles)
-        is_child = (
-            sum([int(check_is_child(role, role_name))
-                 for role_name in allowed_roles]) != 0
-        )
+        is_child = any(check_is_child(role, role_name)
+                       for role_name in allowed_roles)
         is_matching_permission |= is_child
         # break if a matching permission is found
         if is_matching_permission:
@@ -136,19 +178,21 @@ def check_user_group_permission(user, permission_name, resolved_path,
     return is_matching_permission
 
 
-def get_all_urls_with_names():
+def collect_url_names(root_urlconf_name):
     """
-    Gets all Django && user defined url names from the rool url configuration.
+    Collects all Django && user defined url names from the given root url
+    configuration.
 
-    The root url configuration resides in your app's 'urls.py', which is
-    under the app's root folder.
+    Args:
+        root_urlconf_name (str): the module path of the root url
+                                 configuration.
 
     Returns:
         all_url_names (list): List of url names.
     """
 
     # fetch all the url patterns from your rool url configuration
-    root_urlconf = __import__(getattr(settings, urlconf), {}, {}, [''])
+    root_urlconf = __import__(root_urlconf_name, {}, {}, [''])
     url_patterns = root_urlconf.urlpatterns
     all_url_names = []
 
@@ -168,7 +212,108 @@ def get_all_urls_with_names():
     return all_url_names
 
 
-def is_user_permitted(user, group_required, url_name, method):
+def get_all_urls_with_names():
+    """
+    Gets all Django && user defined url names from the rool url configuration.
+
+    The root url configuration resides in your app's 'urls.py', which is
+    under the app's root folder. The url names are collected once, and
+    collected again only if the ROOT_URLCONF setting is replaced.
+
+    Returns:
+        all_url_names (list): List of url names.
+    """
+
+    global collected_url_names
+
+    root_urlconf_name = getattr(settings, urlconf)
+    source, all_url_names = collected_url_names
+    if all_url_names is None or source != root_urlconf_name:
+        all_url_names = collect_url_names(root_urlconf_name)
+        collected_url_names = (root_urlconf_name, all_url_names)
+    return list(all_url_names)
+
+
+def get_transaction_paths():
+    """
+    Returns:
+        transaction_paths (list): (transaction name, lowered paths) tuples
+                                  of all the Transactions ordered by their
+                                  primary keys.
+    """
+
+    transactions = get_policy_manager(
+        Transaction, get_policy_routing()
+    ).order_by('pk').values_list('name', 'paths')
+
+    return [
+        (transaction_name, [path.lower() for path in paths or []])
+        for transaction_name, paths in transactions
+    ]
+
+
+def find_transaction_name(transaction_paths, url_name):
+    """
+    Finds the last Transaction having a path, which contains the url name
+    ignoring the case, as the paths__icontains lookup of is_user_permitted.
+
+    Args:
+        transaction_paths (list): the result of get_transaction_paths.
+        url_name (str): the name of the url.
+
+    Returns:
+        (str): the name of the Transaction, or None.
+    """
+
+    url_name = url_name.lower()
+    for transaction_name, paths in reversed(transaction_paths):
+        if any(url_name in path for path in paths):
+            return transaction_name
+    return None
+
+
+def get_compiled_transactions():
+    """
+    Gets the transaction paths of get_transaction_paths, which are loaded
+    once per process and loaded again whenever a Transaction is saved or
+    deleted.
+
+    Returns:
+        (tuple(list, dict)): the transaction paths and the transaction names
+                             found for the url names so far.
+    """
+
+    global compiled_transactions
+
+    generation, transaction_paths, transaction_names = compiled_transactions
+    current_generation = unmapped_paths.get_generation()
+    if generation != current_generation:
+        transaction_paths = get_transaction_paths()
+        transaction_names = {}
+        compiled_transactions = (current_generation, transaction_paths,
+                                 transaction_names)
+    return transaction_paths, transaction_names
+
+
+def get_compiled_transaction_name(url_name):
+    """
+    Finds the Transaction of the url name within the compiled transactions.
+    The result is kept for each url name, until a Transaction is saved or
+    deleted.
+
+    Returns:
+        (str): the name of the Transaction, or None.
+    """
+
+    transaction_paths, transaction_names = get_compiled_transactions()
+    if url_name not in transaction_names:
+        transaction_names[url_name] = find_transaction_name(
+            transaction_paths, url_name
+        )
+    return transaction_names[url_name]
+
+
+def is_user_permitted(user, group_required, url_name, method, routing=None):
     """
     Check if the given user is permitted to access a resource, which can only
     be accessed by the group_required parameter.
@@ -179,6 +324,8 @@ def is_user_permitted(user, group_required, url_name, method):
                               in order to access a resource.
         url_name (str): the name of the url. It is the resource to be accessed.
         method (str): the lowered request method.
+        routing (tuple): the policy routing of the check.
+                         Defaults to get_policy_routing().
 
     Returns:
         (tuple(bool, bool)): First boolean: whether the user is permitted
@@ -192,25 +339,46 @@ def is_user_permitted(user, group_required, url_name, method):
     if user.is_superuser:
         return True, True
 
+    # the unchecked methods (e.g. CORS preflights) are always granted
+    if is_unchecked_method(method):
+        return True, True
+
+    GRANT_NONEXISTENT_PATH_ACCESS = getattr(
+        settings, 'GRANT_NONEXISTENT_PATH_ACCESS',
+        DEFAULT_GRANT_NONEXISTENT_PATH_ACCESS
+    )
+    # url names without a Transaction are cached until a Transaction
+    # is saved, so that they don't scan the transactions each time
+    generation = unmapped_paths.get_generation()
+    is_unmapped_path = unmapped_paths.contains(url_name, generation)
+    # a nonexistent path is denied whether the user's group is within the
+    # tree or not, so there is no need to check the tree
+    if is_unmapped_path and not GRANT_NONEXISTENT_PATH_ACCESS:
+        return False, False
+
+    # all the policy reads of the check use the same database
+    if routing is None:
+        routing = get_policy_routing()
+
     # this will check the Groups tree to see if the current
     # user's group is a direct child of the given group, is parent of the
     # group or equal to the given group
-    is_in_tree = is_in_group_tree(user, group_required)
+    is_in_tree = is_in_group_tree(user, group_required, routing)
 
     # it is a direct or indirect child so we need to check if this
     # user's group has this view's method permissions.
     if is_in_tree:
-        transaction = Transaction.objects.filter(
-            paths__icontains=url_name
-        ).last()
+        transaction = None
+        if not is_unmapped_path:
+            transaction = get_policy_manager(Transaction, routing).filter(
+                paths__icontains=url_name
+            ).last()
+            if not transaction:
+                unmapped_paths.add(url_name, generation)
         # if the current url path does not belong to any transaction,
         # decide if this means that the access is not granted or
         # a nonexistent path should be granted all accesses.
         if not transaction:
-            GRANT_NONEXISTENT_PATH_ACCESS = getattr(
-                settings, 'GRANT_NONEXISTENT_PATH_ACCESS',
-                DEFAULT_GRANT_NONEXISTENT_PATH_ACCESS
-            )
             return GRANT_NONEXISTENT_PATH_ACCESS, GRANT_NONEXISTENT_PATH_ACCESS
 
         permission_name = transaction.name
@@ -220,7 +388,8 @@ def is_user_permitted(user, group_required, url_name, method):
             user,
             permission_name,
             url_name,
-            method
+            method,
+            routing
         )
         is_permitted = matching_permission
     else:
@@ -233,6 +402,9 @@ def check_is_child(role, group_name):
     """
     Check if the role is the direct or indirect child of the group name.
 
+    The parents are read from the database of the given role and cached on
+    it, so the later calls with the same role don't read them again.
+
     Args:
         role (Role): a Role instance
         group_name (str): a group name.
@@ -0,0 +1,466 @@
+import copy
+import math
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import ResolverMatch
+
+from .classes import GroupPermission, MultiplePermissionsMixin
+from .cache import unmapped_paths
+from .constants import (
+    DEFAULT_LOAD_TEST_MONITOR_INTERVAL,
+    DEFAULT_LOAD_TEST_USER_COUNT,
+    LOAD_TEST_MODES,
+)
+from .decorators import user_groups_required
+from .lookups import get_permitted_users
+from .matrix import get_transaction_url_names
+from .models import Role, RoleMembership, Transaction
+from .operations import get_request_method_operations
+
+
+LOAD_TEST_METHODS = ('get', 'post')
+LOAD_TEST_PERCENTILES = (0.5, 0.99, 0.999)
+# prefixes the names of the scratch transactions and their permissions,
+# which the policy writes change instead of the existing transactions
+LOAD_TEST_NAME_PREFIX = 'rbac-load-test-'
+
+
+class LoadTestView(MultiplePermissionsMixin):
+    """A minimal view, which runs the checks of MultiplePermissionsMixin."""
+
+    def __init__(self, permissions):
+        self.permissions = permissions
+
+    def get_permissions(self):
+        return self.permissions
+
+    def permission_denied(self, request, message=None):
+        raise PermissionDenied
+
+
+def load_test_view(request, *args, **kwargs):
+    return HttpResponse()
+
+
+def check_group_permission(request, groups_required):
+    permission = GroupPermission()
+    permission.groups_required = groups_required
+    return permission.has_permission(request, None)
+
+
+def check_multiple_permissions(request, groups_required):
+    permissions = []
+    for group_required in groups_required:
+        permission = GroupPermission()
+        permission.groups_required = [group_required]
+        permissions.append(permission)
+
+    try:
+        LoadTestView(permissions).check_permissions(request)
+    except PermissionDenied:
+        return False
+    return True
+
+
+def check_user_groups_required(request, groups_required):
+    view = user_groups_required(groups_required)(load_test_view)
+    # the decorator redirects the denied requests
+    return view(request).status_code != 302
+
+
+LOAD_TEST_CHECKS = {
+    'group_permission': check_group_permission,
+    'multiple_permissions': check_multiple_permissions,
+    'user_groups_required': check_user_groups_required,
+}
+
+
+def get_default_scenarios():
+    """
+    Builds the request mix from the existing roles and transactions.
+
+    Returns:
+        (list): (check name, url name, method, groups required) tuples.
+    """
+
+    role_names = list(Role.objects.values_list('name', flat=True))
+    return [
+        (check_name, url_name, method, [role_name])
+        for check_name in sorted(LOAD_TEST_CHECKS)
+        for url_name in get_transaction_url_names()
+        for method in LOAD_TEST_METHODS
+        for role_name in role_names
+    ]
+
+
+def get_default_user_ids(count=DEFAULT_LOAD_TEST_USER_COUNT):
+    User = get_user_model()
+    return list(
+        User.objects.filter(groups__isnull=False).distinct()
+        .order_by('pk').values_list('pk', flat=True)[:count]
+    )
+
+
+def make_request(user, url_name, method):
+    request = getattr(RequestFactory(), method)('/')
+    request.user = user
+    request.resolver_match = ResolverMatch(load_test_view, (), {},
+                                           url_name=url_name)
+    return request
+
+
+def get_current_decision(user, url_name, method, groups_required):
+    """
+    Decides the access with the reverse lookups, which read the current
+    policy without the negative result caches.
+
+    Returns:
+        (bool): whether any of the groups required permits the user.
+    """
+
+    return any(
+        get_permitted_users(url_name, method, group_required).filter(
+            pk=user.pk).exists()
+        for group_required in groups_required
+    )
+
+
+def run_worker(user_ids, scenarios, request_count, seed, verify=True):
+    """
+    Runs the given number of randomly picked checks.
+
+    Each decision is compared with the current policy, unless verify is
+    False. A decision, which differs from it although the policy was not
+    written during the comparison, is stale. If the policy was written
+    in the meantime, the decision is unverified.
+
+    Returns:
+        (dict): the latencies of the successful checks in seconds, the
+                number of permitted, stale and unverified decisions and the
+                number of errors by their exception types.
+    """
+
+    rng = random.Random(seed)
+    users = list(get_user_model().objects.filter(pk__in=user_ids))
+    latencies = []
+    permitted = 0
+    stale = 0
+    unverified = 0
+    errors = Counter()
+
+    try:
+        for _ in range(request_count):
+            check_name, url_name, method, groups_required = rng.choice(
+                scenarios)
+            user = rng.choice(users)
+            request = make_request(user, url_name, method)
+            # the transaction writes increment the generation
+            generation = unmapped_paths.get_generation() if verify else None
+            started_at = time.perf_counter()
+            try:
+                is_permitted = LOAD_TEST_CHECKS[check_name](request,
+                                                            groups_required)
+            except Exception as e:
+                # the failed checks are left out of the latencies
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started_at)
+            permitted += int(bool(is_permitted))
+
+            if not verify:
+                continue
+            is_current = bool(is_permitted) == get_current_decision(
+                user, url_name, method, groups_required
+            )
+            if generation != unmapped_paths.get_generation():
+                unverified += 1
+            elif not is_current:
+                stale += 1
+    finally:
+        connection.close()
+
+    return {'latencies': latencies, 'permitted': permitted, 'stale': stale,
+            'unverified': unverified, 'errors': errors}
+
+
+def toggle_allowed_role(rules, url_name, operation, role_name):
+    """
+    Adds the role to the allowed roles of the operation of the url, or
+    removes it if it is already allowed.
+    """
+
+    allowed_roles = rules.setdefault(url_name, {}).setdefault(operation, [])
+    if role_name in allowed_roles:
+        allowed_roles.remove(role_name)
+    else:
+        allowed_roles.append(role_name)
+
+
+def delete_scratch_policy():
+    """
+    Deletes the scratch transactions, their memberships and permissions,
+    including the ones left behind by an interrupted load test.
+    """
+
+    RoleMembership.objects.filter(
+        transaction__name__startswith=LOAD_TEST_NAME_PREFIX
+    ).delete()
+    Transaction.objects.filter(
+        name__startswith=LOAD_TEST_NAME_PREFIX
+    ).delete()
+    Permission.objects.filter(
+        codename__startswith=LOAD_TEST_NAME_PREFIX
+    ).delete()
+
+
+def create_scratch_policy(scenarios):
+    """
+    Creates a scratch transaction for each url name of the scenarios, with
+    a copy of the rule of the transaction currently found for the url name,
+    a permission and a membership of every role.
+
+    The scratch transactions are created last, so the checks find them
+    instead of the existing transactions of the url names.
+
+    Returns:
+        (list): the scratch Transaction instances.
+    """
+
+    delete_scratch_policy()
+    roles = list(Role.objects.all())
+    content_type = ContentType.objects.get_for_model(Transaction)
+    transactions = []
+
+    for url_name in sorted({scenario[1] for scenario in scenarios}):
+        current = Transaction.objects.filter(paths__icontains=url_name).last()
+        rules = {}
+        if current and (current.rules or {}).get(url_name):
+            rules[url_name] = copy.deepcopy(current.rules[url_name])
+
+        name = LOAD_TEST_NAME_PREFIX + url_name
+        transaction = Transaction.objects.create(name=name, paths=[url_name],
+                                                 rules=rules)
+        permission = Permission.objects.create(codename=name, name=name,
+                                               content_type=content_type)
+        RoleMembership.objects.bulk_create([
+            RoleMembership(role=role, permission=permission,
+                           transaction=transaction)
+            for role in roles
+        ])
+        transactions.append(transaction)
+
+    return transactions
+
+
+def run_policy_writer(stop_event, interval, seed, transactions):
+    """
+    Toggles a random role in a random rule of the given scratch transactions
+    again and again, so that the writes change the decisions of the checks.
+
+    Returns:
+        (int): the number of writes.
+    """
+
+    rng = random.Random(seed)
+    writes = 0
+    method_operations = get_request_method_operations()
+    operations = sorted({method_operations[method]
+                         for method in LOAD_TEST_METHODS
+                         if method in method_operations})
+
+    try:
+        role_names = list(Role.objects.values_list('name', flat=True))
+        while (transactions and role_names and operations and
+                not stop_event.wait(interval)):
+            transaction = rng.choice(transactions)
+            toggle_allowed_role(transaction.rules,
+                                rng.choice(transaction.paths),
+                                rng.choice(operations),
+                                rng.choice(role_names))
+            transaction.save(update_fields=['rules'])
+            writes += 1
+    finally:
+        connection.close()
+
+    return writes
+
+
+def sample_database_activity():
+    """
+    Samples the connections of the current database and the ones waiting
+    for a lock. Only supported on PostgreSQL.
+
+    Returns:
+        (tuple(int, int)): the connections in use and waiting for a lock,
+                           or None for both if it is not supported.
+    """
+
+    database = connections[DEFAULT_DB_ALIAS]
+    if database.vendor != 'postgresql':
+        return None, None
+
+    with database.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*), count(*) FILTER (WHERE wait_event_type = 'Lock') "
+            "FROM pg_stat_activity WHERE datname = current_database()"
+        )
+        return cursor.fetchone()
+
+
+def run_monitor(stop_event, interval):
+    """
+    Returns:
+        (dict): the peak connections in use and the estimated total time
+                spent by the connections waiting for locks in seconds.
+    """
+
+    peak_connections = None
+    lock_wait_time = None
+
+    try:
+        while not stop_event.wait(interval):
+            connections_in_use, lock_waiters = sample_database_activity()
+            if connections_in_use is None:
+                break
+            peak_connections = max(peak_connections or 0, connections_in_use)
+            lock_wait_time = (lock_wait_time or 0) + lock_waiters * interval
+    finally:
+        connection.close()
+
+    return {'peak_connections': peak_connections,
+            'lock_wait_time': lock_wait_time}
+
+
+def percentile(sorted_values, quantile):
+    if not sorted_values:
+        return None
+    index = max(int(math.ceil(quantile * len(sorted_values))) - 1, 0)
+    return sorted_values[index]
+
+
+def run_load_test(request_count=1000, concurrency=4, mode='threads',
+                  write_interval=None, scenarios=None, user_ids=None,
+                  monitor_interval=DEFAULT_LOAD_TEST_MONITOR_INTERVAL,
+                  seed=None, verify=True):
+    """
+    Runs mixed permission checks concurrently and measures them.
+
+    Args:
+        request_count (int): the total number of checks.
+        concurrency (int): the number of worker threads or processes.
+        mode (str): either 'threads' or 'processes'.
+        write_interval (float): the seconds between two concurrent policy
+                                writes, which toggle the roles of the rules
+                                of scratch transactions created for the
+                                url names of the scenarios. None disables
+                                the writes.
+        scenarios (list): (check name, url name, method, groups required)
+                          tuples to pick from. Defaults to all the checks of
+                          all the roles and the url names of the transactions.
+        user_ids (list): the ids of the requesting users.
+        monitor_interval (float): the seconds between two database samples.
+        seed (int): the seed of the random number generators.
+        verify (bool): whether to compare each decision with the current
+                       policy, to count the stale decisions.
+
+    Returns:
+        (dict): the throughput, the latency percentiles in milliseconds,
+                the counts, the errors by their exception types, the peak
+                database connections in use and the estimated lock wait
+                time.
+    """
+
+    if mode not in LOAD_TEST_MODES:
+        raise ValueError('Unknown load test mode: {}'.format(mode))
+    if scenarios is None:
+        scenarios = get_default_scenarios()
+    if user_ids is None:
+        user_ids = get_default_user_ids()
+    if not scenarios or not user_ids:
+        raise ValueError('The load test needs scenarios and users.')
+
+    rng = random.Random(seed)
+    worker_request_counts = [
+        request_count // concurrency + int(index < request_count % concurrency)
+        for index in range(concurrency)
+    ]
+
+    stop_event = threading.Event()
+    background = ThreadPoolExecutor(max_workers=2)
+    writer = None
+    try:
+        if write_interval is not None:
+            scratch_transactions = create_scratch_policy(scenarios)
+        # the forked processes must not share the connections of the parent
+        connections.close_all()
+        if mode == 'threads':
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+        else:
+            # unlike the forked processes, the spawned ones must set up
+            # django
+            executor = ProcessPoolExecutor(max_workers=concurrency,
+                                           initializer=django.setup)
+        started_at = time.perf_counter()
+        with executor:
+            futures = [
+                executor.submit(run_worker, user_ids, scenarios,
+                                worker_request_count, rng.random(), verify)
+                for worker_request_count in worker_request_counts
+            ]
+            # the processes are forked by the first submit, so they don't
+            # inherit the locks held by the threads of the parent
+            monitor = background.submit(run_monitor, stop_event,
+                                        monitor_interval)
+            if write_interval is not None:
+                writer = background.submit(run_policy_writer, stop_event,
+                                           write_interval, rng.random(),
+                                           scratch_transactions)
+            results = [future.result() for future in futures]
+        duration = time.perf_counter() - started_at
+    finally:
+        stop_event.set()
+        background.shutdown()
+        if write_interval is not None:
+            delete_scratch_policy()
+
+    monitor_result = monitor.result()
+    writes = writer.result() if writer else 0
+
+    latencies = sorted(latency for result in results
+                       for latency in result['latencies'])
+    errors = Counter()
+    for result in results:
+        errors.update(result['errors'])
+    # the failed checks are counted, but left out of the latencies
+    requests = len(latencies) + sum(errors.values())
+    report = {
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': requests,
+        'permitted': sum(result['permitted'] for result in results),
+        'stale': sum(result['stale'] for result in results),
+        'unverified': sum(result['unverified'] for result in results),
+        'errors': dict(errors),
+        'policy_writes': writes,
+        'duration': duration,
+        'throughput': requests / duration if duration else None,
+    }
+    for quantile in LOAD_TEST_PERCENTILES:
+        value = percentile(latencies, quantile)
+        key = 'p{}'.format(('%g' % (quantile * 100)).replace('.', ''))
+        report[key] = value * 1000 if value is not None else None
+    report.update(monitor_result)
+
+    return report
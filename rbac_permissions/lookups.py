@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db.models import Q
+
+from .constants import (
+    ALLOW_ALL_ROLES_SYMBOL,
+    DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+    DEFAULT_GRANT_NONEXISTENT_PATH_ACCESS,
+)
+from .matrix import iter_user_chunks
+from .models import Role, RoleMembership, Transaction
+from .operations import get_request_method_operations, is_unchecked_method
+
+
+def get_role_tree():
+    """
+    Loads the whole role hierarchy with a single query.
+
+    Returns:
+        (tuple(dict, dict)): role ids by role names and
+                             child role ids by parent role ids.
+    """
+
+    role_ids_by_name = {}
+    children_by_parent_id = {}
+
+    for role_id, name, parent_id in Role.objects.values_list(
+            'pk', 'name', 'parent_id'):
+        role_ids_by_name[name] = role_id
+        children_by_parent_id.setdefault(parent_id, []).append(role_id)
+
+    return role_ids_by_name, children_by_parent_id
+
+
+def get_descendant_closure(role_ids, children_by_parent_id):
+    """
+    Expands the given roles with all their direct and indirect children.
+
+    A child role is senior to its parent, so it is granted everything
+    its parents are granted.
+
+    Args:
+        role_ids (iterable): the role ids to expand.
+        children_by_parent_id (dict): child role ids by parent role ids.
+
+    Returns:
+        (set): the given role ids and the ids of all their descendants.
+    """
+
+    closure = set(role_ids)
+    stack = list(closure)
+
+    while stack:
+        for child_id in children_by_parent_id.get(stack.pop(), []):
+            if child_id not in closure:
+                closure.add(child_id)
+                stack.append(child_id)
+
+    return closure
+
+
+def get_access_role_ids(url_name, method, group_required=None):
+    """
+    Finds the roles, which grant access to the given url name and method.
+
+    This is the reverse of helpers.is_user_permitted: a user is permitted if
+    she holds one of the tree roles and one of the permitted roles.
+
+    Args:
+        url_name (str): the name of the url.
+        method (str): the lowered request method.
+        group_required (str): the group / role name required by the view.
+                              If None, the role tree is not checked.
+
+    Returns:
+        (tuple(set, set)): the ids of the roles within the required group
+                           tree and the ids of the permitted roles.
+                           None means that any user fulfills the condition.
+    """
+
+    # the unchecked methods (e.g. CORS preflights) are granted to everyone
+    if is_unchecked_method(method):
+        return None, None
+
+    role_ids_by_name, children_by_parent_id = get_role_tree()
+
+    tree_role_ids = None
+    if group_required is not None:
+        required_role_ids = [role_ids_by_name[group_required]] if (
+            group_required in role_ids_by_name) else []
+        tree_role_ids = get_descendant_closure(required_role_ids,
+                                               children_by_parent_id)
+
+    # the paths are matched as a substring of their JSON text, exactly as
+    # the forward check does, so an index on the paths would not be used.
+    # The single Transaction scan is kept on purpose to agree with it.
+    transaction = Transaction.objects.filter(
+        paths__icontains=url_name
+    ).last()
+    # a path without a transaction is granted to the tree depending on
+    # the GRANT_NONEXISTENT_PATH_ACCESS setting
+    if not transaction:
+        GRANT_NONEXISTENT_PATH_ACCESS = getattr(
+            settings, 'GRANT_NONEXISTENT_PATH_ACCESS',
+            DEFAULT_GRANT_NONEXISTENT_PATH_ACCESS
+        )
+        return tree_role_ids, None if GRANT_NONEXISTENT_PATH_ACCESS else set()
+
+    # a nonexistent permission is granted to everyone within the tree
+    if not Permission.objects.filter(codename=transaction.name).exists():
+        return tree_role_ids, None
+
+    # the last membership of each role decides, as in the forward check
+    memberships = RoleMembership.objects.filter(
+        transaction__name=transaction.name,
+        transaction__paths__contains=url_name,
+        role__isnull=False,
+    ).order_by('pk').values_list('role_id', 'transaction__rules')
+    rules_by_role_id = dict(memberships)
+
+    operation = get_request_method_operations().get(method)
+    permitted_role_ids = set()
+
+    for role_id, rules in rules_by_role_id.items():
+        transaction_rule = (rules or {}).get(url_name)
+        # if the rule is not defined for this url, the role is permitted
+        if not transaction_rule:
+            permitted_role_ids.add(role_id)
+            continue
+
+        allowed_roles = transaction_rule.get(operation) or []
+        if ALLOW_ALL_ROLES_SYMBOL in allowed_roles:
+            permitted_role_ids.add(role_id)
+            continue
+
+        allowed_role_ids = get_descendant_closure(
+            [role_ids_by_name[name] for name in allowed_roles
+             if name in role_ids_by_name],
+            children_by_parent_id
+        )
+        if role_id in allowed_role_ids:
+            permitted_role_ids.add(role_id)
+
+    return tree_role_ids, permitted_role_ids
+
+
+def get_permitted_roles(url_name, method, group_required=None):
+    """
+    Returns:
+        (QuerySet): a lazy queryset of the roles, whose members are
+                    permitted to access the given url name and method.
+    """
+
+    tree_role_ids, permitted_role_ids = get_access_role_ids(
+        url_name, method, group_required
+    )
+    roles = Role.objects.all()
+    if tree_role_ids is not None:
+        roles = roles.filter(pk__in=tree_role_ids)
+    if permitted_role_ids is not None:
+        roles = roles.filter(pk__in=permitted_role_ids)
+    return roles
+
+
+def get_permitted_users(url_name, method, group_required=None):
+    """
+    Returns:
+        (QuerySet): a lazy queryset of the users, who are permitted to
+                    access the given url name and method.
+    """
+
+    User = get_user_model()
+    UserGroup = User.groups.through
+    tree_role_ids, permitted_role_ids = get_access_role_ids(
+        url_name, method, group_required
+    )
+
+    # each condition may be fulfilled by a different role of the user
+    lookup = Q()
+    for role_ids in (tree_role_ids, permitted_role_ids):
+        if role_ids is not None:
+            lookup &= Q(pk__in=UserGroup.objects.filter(
+                group_id__in=role_ids
+            ).values('user_id'))
+
+    # without any condition, everyone is permitted
+    if not lookup:
+        return User.objects.all()
+    # superusers are always permitted
+    return User.objects.filter(lookup | Q(is_superuser=True))
+
+
+def iter_permitted_users(url_name, method, group_required=None,
+                         chunk_size=DEFAULT_ACCESS_MATRIX_CHUNK_SIZE):
+    """
+    Iterates over the permitted users in chunks.
+
+    Yields:
+        (list): a list of User instances.
+    """
+
+    users = get_permitted_users(url_name, method, group_required)
+    for chunk in iter_user_chunks(chunk_size, queryset=users):
+        yield chunk
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+
+from rbac_permissions.constants import (
+    ACCESS_MATRIX_FORMATS,
+    DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+    DEFAULT_ACCESS_MATRIX_MAX_ROLE_SETS,
+)
+from rbac_permissions.matrix import write_access_matrix
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the access matrix of all users, required groups, '
+        'url names and request methods as CSV or JSON lines.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', dest='output_format', default='csv',
+            choices=ACCESS_MATRIX_FORMATS,
+            help='The output format.'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='The output file path. Defaults to the standard output.'
+        )
+        parser.add_argument(
+            '--group', dest='groups_required', action='append',
+            help='A required group / role name. Defaults to all roles.'
+        )
+        parser.add_argument(
+            '--url-name', dest='url_names', action='append',
+            help='A url name. Defaults to all url names of the Transactions.'
+        )
+        parser.add_argument(
+            '--method', dest='methods', action='append',
+            help='A request method. Defaults to all CRUD methods.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int,
+            default=DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+            help='The number of users fetched by each query.'
+        )
+        parser.add_argument(
+            '--max-role-sets', type=int,
+            default=DEFAULT_ACCESS_MATRIX_MAX_ROLE_SETS,
+            help='The number of distinct group sets whose results are kept.'
+        )
+
+    def handle(self, *args, **options):
+        def progress(processed_users, total_users):
+            self.stderr.write(
+                'Processed {} of {} users'.format(processed_users,
+                                                   total_users)
+            )
+
+        methods = options['methods']
+        if methods:
+            methods = [method.lower() for method in methods]
+
+        kwargs = {
+            'output_format': options['output_format'],
+            'groups_required': options['groups_required'],
+            'url_names': options['url_names'],
+            'methods': methods,
+            'chunk_size': options['chunk_size'],
+            'max_role_sets': options['max_role_sets'],
+            'progress': progress,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as stream:
+                row_count = write_access_matrix(stream, **kwargs)
+        else:
+            row_count = write_access_matrix(self.stdout, **kwargs)
+
+        self.stderr.write('Exported {} rows'.format(row_count))
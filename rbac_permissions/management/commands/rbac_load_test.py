@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rbac_permissions.constants import LOAD_TEST_MODES
+from rbac_permissions.loadtest import run_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs mixed permission checks concurrently through GroupPermission, '
+        'MultiplePermissionsMixin and user_groups_required, and reports '
+        'the throughput, latencies, stale decisions, errors and database '
+        'activity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='The total number of permission checks.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='The number of worker threads or processes.'
+        )
+        parser.add_argument(
+            '--mode', default='threads', choices=LOAD_TEST_MODES,
+            help='Whether to run the workers in threads or processes.'
+        )
+        parser.add_argument(
+            '--write-interval', type=float, default=None,
+            help='The seconds between two concurrent policy writes. '
+                 'The policy is not written by default.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='The seed of the random number generators.'
+        )
+        parser.add_argument(
+            '--no-verify', action='store_false', dest='verify',
+            help='Does not compare the decisions with the current policy.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run_load_test(
+                request_count=options['requests'],
+                concurrency=options['concurrency'],
+                mode=options['mode'],
+                write_interval=options['write_interval'],
+                seed=options['seed'],
+                verify=options['verify'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for key, value in report.items():
+            if isinstance(value, float):
+                value = '{:.3f}'.format(value)
+            self.stdout.write('{}: {}'.format(key, value))
@@ -0,0 +1,191 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+
+from .constants import (
+    DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+    DEFAULT_ACCESS_MATRIX_MAX_ROLE_SETS,
+)
+from .helpers import is_user_permitted
+from .models import Role, Transaction
+from .operations import get_request_method_operations
+
+
+ACCESS_MATRIX_FIELDS = (
+    'user_id', 'username', 'group_required', 'url_name', 'method',
+    'is_permitted', 'is_in_tree'
+)
+
+
+def get_transaction_url_names():
+    """
+    Returns:
+        (list): the sorted distinct url names of all Transactions.
+    """
+
+    url_names = set()
+    for paths in Transaction.objects.values_list('paths', flat=True):
+        url_names.update(paths or [])
+    return sorted(url_names)
+
+
+def iter_user_chunks(chunk_size=DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+                     queryset=None):
+    """
+    Iterates over the users in chunks ordered by their primary keys.
+
+    Each chunk is fetched with its own query, which continues from the last
+    primary key of the previous chunk, so that only one chunk is held in
+    memory at a time.
+
+    Args:
+        chunk_size (int): the number of users in each chunk.
+        queryset (QuerySet): the users to iterate over. Defaults to all
+                             users with their groups prefetched.
+
+    Yields:
+        (list): a list of User instances.
+    """
+
+    if queryset is None:
+        queryset = get_user_model().objects.prefetch_related('groups')
+    queryset = queryset.order_by('pk')
+    last_pk = None
+
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def get_role_set_key(user):
+    """
+    Returns:
+        (tuple): a key, which is equal for all users whose permissions
+                 are evaluated the same way.
+    """
+
+    if user.is_superuser:
+        return True, frozenset()
+    return False, frozenset(group.pk for group in user.groups.all())
+
+
+def iter_access_matrix(groups_required=None, url_names=None, methods=None,
+                       chunk_size=DEFAULT_ACCESS_MATRIX_CHUNK_SIZE,
+                       progress=None,
+                       max_role_sets=DEFAULT_ACCESS_MATRIX_MAX_ROLE_SETS):
+    """
+    Iterates over the access matrix of all users.
+
+    The access of a user only depends on her groups, so the combinations
+    are evaluated once for the first user of each distinct group set and
+    reused for the remaining users having the same groups.
+
+    The results of at most max_role_sets group sets are kept, so the memory
+    is bounded by max_role_sets * groups * url names * methods results.
+    The users of the group sets seen after that are evaluated one by one.
+
+    Args:
+        groups_required (list): the required group / role names.
+                                Defaults to all the role names.
+        url_names (list): the url names. Defaults to all the url names of
+                          the Transactions.
+        methods (list): the lowered request methods. Defaults to all the
+                        methods mapped to a CRUD operation.
+        chunk_size (int): the number of users fetched by each query.
+        progress (callable): called with the number of processed users
+                             and the total number of users after each chunk.
+        max_role_sets (int): the number of group sets whose results are
+                             kept.
+
+    Yields:
+        (dict): a row of the matrix with the keys in ACCESS_MATRIX_FIELDS.
+    """
+
+    if groups_required is None:
+        groups_required = list(
+            Role.objects.order_by('name').values_list('name', flat=True)
+        )
+    if url_names is None:
+        url_names = get_transaction_url_names()
+    if methods is None:
+        methods = list(get_request_method_operations().keys())
+
+    combinations = [
+        (group_required, url_name, method)
+        for group_required in groups_required
+        for url_name in url_names
+        for method in methods
+    ]
+    evaluated_role_sets = {}
+    total_users = get_user_model().objects.count()
+    processed_users = 0
+
+    for chunk in iter_user_chunks(chunk_size):
+        for user in chunk:
+            key = get_role_set_key(user)
+            results = evaluated_role_sets.get(key)
+            if results is None:
+                results = [
+                    is_user_permitted(user, group_required, url_name, method)
+                    for group_required, url_name, method in combinations
+                ]
+                if len(evaluated_role_sets) < max_role_sets:
+                    evaluated_role_sets[key] = results
+
+            for (group_required, url_name, method), result in zip(
+                    combinations, results):
+                is_permitted, is_in_tree = result
+                yield {
+                    'user_id': user.pk,
+                    'username': user.get_username(),
+                    'group_required': group_required,
+                    'url_name': url_name,
+                    'method': method,
+                    'is_permitted': is_permitted,
+                    'is_in_tree': is_in_tree,
+                }
+
+        processed_users += len(chunk)
+        if progress:
+            progress(processed_users, total_users)
+
+
+def write_access_matrix(stream, output_format='csv', **kwargs):
+    """
+    Writes the access matrix to the given stream row by row.
+
+    Args:
+        stream (file): a text stream to write into.
+        output_format (str): either 'csv' or 'jsonl'.
+        kwargs: passed to iter_access_matrix.
+
+    Returns:
+        (int): the number of written rows.
+    """
+
+    rows = iter_access_matrix(**kwargs)
+    row_count = 0
+
+    if output_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=ACCESS_MATRIX_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    elif output_format == 'jsonl':
+        for row in rows:
+            stream.write(json.dumps(row) + '\n')
+            row_count += 1
+    else:
+        raise ValueError(
+            'Unknown access matrix format: {}'.format(output_format)
+        )
+
+    return row_count
@@ -1,21 +1,31 @@
+from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.core.exceptions import PermissionDenied
 from django.utils.deprecation import MiddlewareMixin
 
 from .constants import (
     DEFAULT_ADMIN_URL_NAME as admin_url_name,
-    DEFAULT_ADMIN_PERMISSION_NAME as admin_permission_name
+    DEFAULT_ADMIN_PERMISSION_NAME as admin_permission_name,
+    DEFAULT_ENFORCED_URL_NAMESPACES,
+)
+from .helpers import (
+    check_user_group_permission,
+    get_compiled_transaction_name,
 )
-from .helpers import check_user_group_permission
 
 
 class CheckAdminRoleAuthorizationMiddleware(MiddlewareMixin):
+    admin_index_path = None
+
     def process_request(self, request):
         """
         Checks if the current user is permitted to access the admin home page.
         """
         is_permitted = True
-        admin_index_path = reverse(admin_url_name)
+        # the admin index path is resolved once per process
+        if self.admin_index_path is None:
+            self.admin_index_path = reverse(admin_url_name)
+        admin_index_path = self.admin_index_path
         if request.path == admin_index_path:
             if request.user.is_authenticated():
                 is_permitted = check_user_group_permission(
@@ -26,3 +36,48 @@ class CheckAdminRoleAuthorizationMiddleware(MiddlewareMixin):
                 )
         if not is_permitted:
             raise PermissionDenied
+
+
+class CheckRoleAuthorizationMiddleware(MiddlewareMixin):
+    """
+    Checks the role authorization of the requests to the url namespaces in
+    ENFORCED_URL_NAMESPACES, before their views are called.
+
+    The transactions are loaded once, and loaded again whenever a Transaction
+    is saved or deleted. A url name belongs to the last transaction having
+    a path, which contains it ignoring the case, as in is_user_permitted.
+    The requests to other namespaces or to url names without a transaction
+    are passed through without any database query.
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.enforced_namespaces = frozenset(getattr(
+            settings, 'ENFORCED_URL_NAMESPACES',
+            DEFAULT_ENFORCED_URL_NAMESPACES
+        ))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        resolver_match = request.resolver_match
+        if (resolver_match is None or
+                resolver_match.namespace not in self.enforced_namespaces):
+            return None
+
+        url_name = resolver_match.url_name
+        transaction_name = get_compiled_transaction_name(url_name)
+        if transaction_name is None:
+            return None
+
+        # anonymous users are left to the authentication of the views
+        if not request.user.is_authenticated():
+            return None
+
+        is_permitted = check_user_group_permission(
+            request.user,
+            transaction_name,
+            url_name,
+            request.method.lower(),
+        )
+        if not is_permitted:
+            raise PermissionDenied
+        return None
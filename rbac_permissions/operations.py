@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .constants import (
+    DEFAULT_REQUEST_METHOD_OPERATIONS,
+    DEFAULT_UNCHECKED_REQUEST_METHODS,
+    REQUEST_METHODS_TO_CRUD_OPERATIONS,
+)
+
+
+# the built mapping of get_request_method_operations, as a
+# (REQUEST_METHOD_OPERATIONS setting, operations by request methods) tuple
+built_request_method_operations = (None, None)
+# the built methods of get_unchecked_request_methods, as a
+# (UNCHECKED_REQUEST_METHODS setting, lowered request methods) tuple
+built_unchecked_request_methods = (None, None)
+
+
+def build_request_method_operations(method_operations):
+    """
+    Validates the REQUEST_METHOD_OPERATIONS setting and merges it into the
+    default request method to operation mapping.
+
+    Args:
+        method_operations (dict): operations by request methods. An operation
+                                  of None removes the request method.
+
+    Returns:
+        operations (dict): operations by lowered request methods.
+    """
+
+    if not isinstance(method_operations, dict):
+        raise ImproperlyConfigured(
+            'REQUEST_METHOD_OPERATIONS must be a dict.'
+        )
+
+    operations = dict(REQUEST_METHODS_TO_CRUD_OPERATIONS)
+    for method, operation in method_operations.items():
+        if not isinstance(method, str) or not method:
+            raise ImproperlyConfigured(
+                'Invalid request method in REQUEST_METHOD_OPERATIONS: '
+                '{!r}'.format(method)
+            )
+        if operation is None:
+            operations.pop(method.lower(), None)
+            continue
+        if not isinstance(operation, str) or not operation:
+            raise ImproperlyConfigured(
+                'Invalid operation of the request method {} in '
+                'REQUEST_METHOD_OPERATIONS: {!r}'.format(method, operation)
+            )
+        operations[method.lower()] = operation
+
+    return operations
+
+
+def get_request_method_operations():
+    """
+    Gets the request method to operation mapping. It is built and validated
+    once, and built again only if the setting is replaced.
+
+    Returns:
+        (dict): operations by lowered request methods.
+    """
+
+    global built_request_method_operations
+
+    method_operations = getattr(settings, 'REQUEST_METHOD_OPERATIONS',
+                                DEFAULT_REQUEST_METHOD_OPERATIONS)
+    source, operations = built_request_method_operations
+    if operations is None or source is not method_operations:
+        operations = build_request_method_operations(method_operations)
+        built_request_method_operations = (method_operations, operations)
+    return operations
+
+
+def get_operations():
+    """
+    Returns:
+        (list): the sorted distinct operations of the rules.
+    """
+
+    return sorted(set(get_request_method_operations().values()))
+
+
+def build_unchecked_request_methods(methods):
+    """
+    Validates the UNCHECKED_REQUEST_METHODS setting.
+
+    Args:
+        methods (list or tuple): the request methods, which are not checked.
+
+    Returns:
+        (frozenset): the lowered request methods.
+    """
+
+    if not isinstance(methods, (list, tuple)):
+        raise ImproperlyConfigured(
+            'UNCHECKED_REQUEST_METHODS must be a list or a tuple.'
+        )
+
+    for method in methods:
+        if not isinstance(method, str) or not method:
+            raise ImproperlyConfigured(
+                'Invalid request method in UNCHECKED_REQUEST_METHODS: '
+                '{!r}'.format(method)
+            )
+
+    return frozenset(method.lower() for method in methods)
+
+
+def get_unchecked_request_methods():
+    """
+    Gets the request methods, which are not checked. They are built and
+    validated once, and built again only if the setting is replaced.
+
+    Returns:
+        (frozenset): the lowered request methods.
+    """
+
+    global built_unchecked_request_methods
+
+    methods = getattr(settings, 'UNCHECKED_REQUEST_METHODS',
+                      DEFAULT_UNCHECKED_REQUEST_METHODS)
+    source, unchecked_methods = built_unchecked_request_methods
+    if unchecked_methods is None or source is not methods:
+        unchecked_methods = build_unchecked_request_methods(methods)
+        built_unchecked_request_methods = (methods, unchecked_methods)
+    return unchecked_methods
+
+
+def is_unchecked_method(method):
+    """
+    Checks if the requests with the given method (e.g. CORS preflights) are
+    granted without checking the policy.
+
+    Args:
+        method (str): the lowered request method.
+
+    Returns:
+        (bool): True if the method is not checked.
+    """
+
+    return method in get_unchecked_request_methods()
@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from .constants import (
+    DEFAULT_POLICY_ROUTER_HINTS,
+    DEFAULT_POLICY_ROUTING_CACHE_ALIAS,
+    DEFAULT_POLICY_WRITE_STICKINESS,
+)
+
+
+POLICY_CHANGED_CACHE_KEY = 'rbac_permissions:policy_changed'
+# the hints passed to the database routers with POLICY_ROUTER_HINTS
+POLICY_READ_HINT = 'rbac_policy_read'
+POLICY_RECENTLY_CHANGED_HINT = 'rbac_policy_recently_changed'
+
+
+def get_policy_routing_cache():
+    alias = getattr(settings, 'POLICY_ROUTING_CACHE_ALIAS',
+                    DEFAULT_POLICY_ROUTING_CACHE_ALIAS)
+    return caches[alias]
+
+
+def is_policy_routed():
+    """
+    Returns:
+        (bool): whether the policy reads are routed with either
+                POLICY_READ_DATABASE or POLICY_ROUTER_HINTS.
+    """
+
+    return (getattr(settings, 'POLICY_READ_DATABASE', None) is not None or
+            getattr(settings, 'POLICY_ROUTER_HINTS',
+                    DEFAULT_POLICY_ROUTER_HINTS))
+
+
+def mark_policy_changed():
+    """
+    Records that the policy (roles, transactions, memberships, permissions
+    or user groups) has just been written, so that the policy reads stick
+    to the primary database for POLICY_WRITE_STICKINESS seconds.
+    """
+
+    if not is_policy_routed():
+        return
+
+    stickiness = getattr(settings, 'POLICY_WRITE_STICKINESS',
+                         DEFAULT_POLICY_WRITE_STICKINESS)
+    if stickiness:
+        get_policy_routing_cache().set(POLICY_CHANGED_CACHE_KEY, True,
+                                       stickiness)
+
+
+def is_policy_recently_changed():
+    """
+    Returns:
+        (bool): whether the policy has been written within the last
+                POLICY_WRITE_STICKINESS seconds.
+    """
+
+    return get_policy_routing_cache().get(POLICY_CHANGED_CACHE_KEY) is not None
+
+
+def get_policy_routing():
+    """
+    Decides where the policy reads of a single permission check go, so that
+    all the reads of the check use the same database.
+
+    The policy reads go to the POLICY_READ_DATABASE alias (e.g. a read
+    replica), unless the policy has recently been changed. In that case,
+    they go to POLICY_WRITE_DATABASE, so that the changes are read back
+    before the replica catches up.
+
+    Without POLICY_READ_DATABASE, POLICY_ROUTER_HINTS leaves the decision
+    to the database routers instead. Their db_for_read receives the
+    POLICY_READ_HINT and POLICY_RECENTLY_CHANGED_HINT hints.
+
+    Returns:
+        (tuple(str, dict)): the database alias, or None to use the routers,
+                            and the hints passed to the routers.
+    """
+
+    if not is_policy_routed():
+        return None, {}
+
+    is_recently_changed = is_policy_recently_changed()
+    read_database = getattr(settings, 'POLICY_READ_DATABASE', None)
+    if read_database is None:
+        return None, {POLICY_READ_HINT: True,
+                      POLICY_RECENTLY_CHANGED_HINT: is_recently_changed}
+
+    if is_recently_changed:
+        return getattr(settings, 'POLICY_WRITE_DATABASE',
+                       DEFAULT_DB_ALIAS), {}
+    return read_database, {}
+
+
+def get_policy_database():
+    """
+    Returns:
+        (str): the database alias of the policy reads, or None to use
+               the database routers. See get_policy_routing.
+    """
+
+    database, _ = get_policy_routing()
+    return database
+
+
+def get_policy_manager(model, routing):
+    """
+    Gets the default manager of the given model, which reads the policy as
+    decided by get_policy_routing.
+
+    Args:
+        model (Model): a model class.
+        routing (tuple(str, dict)): the result of get_policy_routing.
+
+    Returns:
+        (Manager): the manager of the routed reads.
+    """
+
+    database, hints = routing
+    return model._default_manager.db_manager(database, hints=hints)
@@ -1,8 +1,19 @@
 from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+)
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
+from .cache import missing_permissions, unmapped_paths
+from .routing import mark_policy_changed
+
 
 def role_pre_save_actions(instance):
     """
@@ -91,3 +102,59 @@ def role_post_save_actions(instance, created):
             permission=permission, role=instance, transaction=transaction
         )
     instance.save()
+
+
+@receiver([post_save, post_delete], sender='rbac_permissions.Transaction')
+def transaction_post_save_actions(sender, instance, **kwargs):
+    """
+    Invalidates the cached url names without a Transaction, since the saved
+    Transaction may contain any of them. The generation of these url names
+    also tells the middleware to recompile its url name mapping.
+    """
+
+    unmapped_paths.invalidate()
+
+
+@receiver(post_save, sender=Permission)
+def permission_post_save_actions(sender, instance, **kwargs):
+    """Invalidates the cached nonexistent permission codenames."""
+    missing_permissions.invalidate()
+
+
+@receiver(post_migrate)
+def post_migrate_actions(sender, **kwargs):
+    """
+    Invalidates the negative result caches, since migrations create
+    the default permissions in bulk without sending post_save.
+    """
+
+    unmapped_paths.invalidate()
+    missing_permissions.invalidate()
+
+
+@receiver([post_save, post_delete], sender='rbac_permissions.Transaction')
+@receiver([post_save, post_delete], sender='rbac_permissions.Role')
+@receiver([post_save, post_delete], sender='rbac_permissions.RoleMembership')
+@receiver([post_save, post_delete], sender=Permission)
+def policy_post_save_actions(sender, **kwargs):
+    """
+    Makes the policy reads stick to the primary database for a while,
+    since a read replica may not have the written policy yet.
+    """
+
+    mark_policy_changed()
+
+
+@receiver(m2m_changed)
+def policy_m2m_changed_actions(sender, action, **kwargs):
+    """
+    Does the same as policy_post_save_actions for the changes of the
+    user groups and the group permissions.
+    """
+
+    if not action.startswith('post_'):
+        return
+
+    if sender in (get_user_model().groups.through,
+                  Group.permissions.through):
+        mark_policy_changed()
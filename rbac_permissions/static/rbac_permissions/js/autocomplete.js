@@ -0,0 +1,108 @@
+/*
+ * Enhances the select boxes rendered by AutocompleteSelectMultiple.
+ *
+ * The select box only holds the selected options. A search box fetches
+ * further choices page by page from the url in data-autocomplete-url.
+ */
+(function() {
+    'use strict';
+
+    function fetchPage(url, term, page, callback) {
+        var request = new XMLHttpRequest();
+        var query = '?term=' + encodeURIComponent(term) + '&page=' + page;
+        request.open('GET', url + query);
+        request.onload = function() {
+            if (request.status === 200) {
+                callback(JSON.parse(request.responseText));
+            }
+        };
+        request.send();
+    }
+
+    function renderSelected(select, list) {
+        list.innerHTML = '';
+        Array.prototype.forEach.call(select.options, function(option) {
+            var item = document.createElement('li');
+            var remove = document.createElement('a');
+            item.textContent = option.text + ' ';
+            remove.href = '#';
+            remove.textContent = '×';
+            remove.addEventListener('click', function(event) {
+                event.preventDefault();
+                select.removeChild(option);
+                renderSelected(select, list);
+            });
+            item.appendChild(remove);
+            list.appendChild(item);
+        });
+    }
+
+    function init(select) {
+        var url = select.getAttribute('data-autocomplete-url');
+        var selected = document.createElement('ul');
+        var search = document.createElement('input');
+        var results = document.createElement('ul');
+        var more = document.createElement('a');
+        var term = '';
+        var page = 1;
+        var timer = null;
+
+        selected.className = 'rbac-autocomplete-selected';
+        results.className = 'rbac-autocomplete-results';
+        search.type = 'search';
+        search.placeholder = 'Search';
+        more.href = '#';
+        more.textContent = 'More';
+        more.style.display = 'none';
+        select.style.display = 'none';
+        select.parentNode.insertBefore(selected, select.nextSibling);
+        selected.parentNode.insertBefore(search, selected.nextSibling);
+        search.parentNode.insertBefore(results, search.nextSibling);
+        results.parentNode.insertBefore(more, results.nextSibling);
+
+        function addOption(result) {
+            var exists = Array.prototype.some.call(select.options,
+                function(option) { return option.value === result.id; });
+            if (!exists) {
+                select.appendChild(new Option(result.text, result.id,
+                                              true, true));
+                renderSelected(select, selected);
+            }
+        }
+
+        function load() {
+            fetchPage(url, term, page, function(data) {
+                data.results.forEach(function(result) {
+                    var item = document.createElement('li');
+                    item.textContent = result.text;
+                    item.addEventListener('click', function() {
+                        addOption(result);
+                    });
+                    results.appendChild(item);
+                });
+                more.style.display = data.pagination.more ? '' : 'none';
+            });
+        }
+
+        search.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                term = search.value;
+                page = 1;
+                results.innerHTML = '';
+                load();
+            }, 250);
+        });
+        more.addEventListener('click', function(event) {
+            event.preventDefault();
+            page += 1;
+            load();
+        });
+        renderSelected(select, selected);
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        var selects = document.querySelectorAll('select.rbac-autocomplete');
+        Array.prototype.forEach.call(selects, init);
+    });
+})();
@@ -1,6 +1,832 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from django.test import TestCase
+import csv
+import json
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.apps import apps
+from django.conf.urls import url
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import ResolverMatch, reverse
+
+from . import decorators, loadtest, matrix, warmup
+from .cache import missing_permissions, unmapped_paths
+from .differential import (
+    DEFAULT_ENGINES,
+    find_mismatches,
+    run_differential_check,
+)
+from .helpers import check_user_group_permission, is_user_permitted
+from .lookups import get_permitted_roles, get_permitted_users
+from .middleware import CheckRoleAuthorizationMiddleware
+from .models import Role, RoleMembership, Transaction
+from .operations import (
+    get_request_method_operations,
+    get_unchecked_request_methods,
+    is_unchecked_method,
+)
+from .routing import (
+    POLICY_CHANGED_CACHE_KEY,
+    POLICY_READ_HINT,
+    POLICY_RECENTLY_CHANGED_HINT,
+    get_policy_routing_cache,
+)
+
+
+# the tests use this module as their url configuration
+urlpatterns = [
+    url(r'^admin/', admin.site.urls),
+]
+
+# the test caches with a cache, which doesn't keep anything
+DUMMY_CACHES = dict(settings.CACHES, dummy={
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+})
+
+# a second database of the test settings, which plays the read replica
+REPLICA_DATABASE = next(
+    (alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS),
+    None
+)
+
+
+class PolicyReplicaRouter(object):
+    """Sends the policy reads to the replica, unless they were changed."""
+
+    def db_for_read(self, model, **hints):
+        if (hints.get(POLICY_READ_HINT) and
+                not hints[POLICY_RECENTLY_CHANGED_HINT]):
+            return REPLICA_DATABASE
+        return None
+
+
+# the module configuration model of the wrapping app is not needed
+rbac_test_settings = override_settings(
+    ROOT_URLCONF='rbac_permissions.tests',
+    MODULE_CONFIGURATION_PATH='rbac_permissions.tests.ModuleConfiguration',
+)
+
+
+@rbac_test_settings
+class RbacTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.User = get_user_model()
+        cls.content_type = ContentType.objects.get_for_model(Transaction)
+
+    def setUp(self):
+        # the cached results would outlive the rolled back test data
+        caches['default'].clear()
+
+    def create_user(self, username, **kwargs):
+        return self.User.objects.create(
+            **{self.User.USERNAME_FIELD: username}, **kwargs
+        )
+
+    def create_permission(self, codename):
+        return Permission.objects.create(codename=codename, name=codename,
+                                         content_type=self.content_type)
+
+
+class RoleAdminTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin_user = self.create_user('admin', is_superuser=True,
+                                           is_staff=True)
+        self.client.force_login(self.admin_user)
+        self.role = Role(name='driver').save()
+        self.change_url = reverse('admin:rbac_permissions_role_change',
+                                  args=[self.role.pk])
+
+    def add_memberships(self, count):
+        for index in range(count):
+            name = 'transaction{}'.format(RoleMembership.objects.count())
+            RoleMembership.objects.create(
+                role=self.role,
+                permission=self.create_permission(name),
+                transaction=Transaction.objects.create(name=name)
+            )
+            self.role.user_set.add(self.create_user(name))
+
+    def assertSameNumQueries(self, make_request, add_data):
+        """Asserts that make_request makes as many queries after add_data."""
+        # the first request fills the process wide caches (content types..)
+        make_request()
+        with CaptureQueriesContext(connection) as queries:
+            make_request()
+        add_data()
+        with self.assertNumQueries(len(queries)):
+            make_request()
+
+    def test_change_page_queries_dont_grow_with_memberships(self):
+        self.add_memberships(1)
+        self.assertSameNumQueries(
+            lambda: self.client.get(self.change_url),
+            lambda: self.add_memberships(10)
+        )
+
+    def test_autocomplete_queries_dont_grow_with_results(self):
+        self.add_memberships(1)
+        for name in ('users', 'permissions'):
+            autocomplete_url = reverse(
+                'admin:rbac_permissions_role_{}_autocomplete'.format(name)
+            )
+            self.assertSameNumQueries(
+                lambda: self.client.get(autocomplete_url,
+                                        {'term': 'transaction'}),
+                lambda: self.add_memberships(10)
+            )
+
+    def test_paths_autocomplete(self):
+        autocomplete_url = reverse(
+            'admin:rbac_permissions_transaction_paths_autocomplete'
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(autocomplete_url, {'term': 'role_ch'})
+        self.assertIn(
+            {'id': 'rbac_permissions_role_change',
+             'text': 'rbac_permissions_role_change'},
+            response.json()['results']
+        )
+
+    def test_save_applies_user_changes_once(self):
+        self.add_memberships(2)
+        kept_user, removed_user = self.role.user_set.order_by('pk')
+        added_user = self.create_user('added')
+        actions = []
+
+        def record_action(sender, action, **kwargs):
+            if action.startswith('post_'):
+                actions.append(action)
+
+        data = {
+            'name': self.role.name,
+            'users': [kept_user.pk, added_user.pk],
+            'memberships-TOTAL_FORMS': 0,
+            'memberships-INITIAL_FORMS': 0,
+            'memberships-MIN_NUM_FORMS': 0,
+            'memberships-MAX_NUM_FORMS': 1000,
+        }
+        through = self.User.groups.through
+        m2m_changed.connect(record_action, sender=through)
+        try:
+            response = self.client.post(self.change_url, data)
+        finally:
+            m2m_changed.disconnect(record_action, sender=through)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(actions, ['post_remove', 'post_add'])
+        self.assertEqual(set(self.role.user_set.all()),
+                         {kept_user, added_user})
+
+
+class NegativeResultCacheTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.role = Role(name='driver').save()
+        self.user = self.create_user('driver')
+        self.role.user_set.add(self.user)
+
+    @override_settings(GRANT_NONEXISTENT_PATH_ACCESS=False)
+    def test_cached_unmapped_path_makes_no_queries(self):
+        self.assertEqual(
+            is_user_permitted(self.user, 'driver', 'vehicle-list', 'get'),
+            (False, False)
+        )
+        self.assertTrue(unmapped_paths.contains('vehicle-list'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                is_user_permitted(self.user, 'driver', 'vehicle-list', 'get'),
+                (False, False)
+            )
+
+    def test_saved_transaction_invalidates_unmapped_paths(self):
+        is_user_permitted(self.user, 'driver', 'vehicle-list', 'get')
+        self.assertTrue(unmapped_paths.contains('vehicle-list'))
+
+        transaction = Transaction.objects.create(name='vehicles',
+                                                 paths=['vehicle-list'])
+        self.assertFalse(unmapped_paths.contains('vehicle-list'))
+
+        is_user_permitted(self.user, 'driver', 'order-list', 'get')
+        transaction.delete()
+        self.assertFalse(unmapped_paths.contains('order-list'))
+
+    def test_saved_permission_invalidates_missing_permissions(self):
+        self.assertTrue(
+            check_user_group_permission(self.user, 'vehicles', 'vehicle-list')
+        )
+        self.assertTrue(missing_permissions.contains('vehicles'))
+
+        with self.assertNumQueries(0):
+            check_user_group_permission(self.user, 'vehicles', 'vehicle-list')
+
+        self.create_permission('vehicles')
+        self.assertFalse(missing_permissions.contains('vehicles'))
+
+    def test_generation_is_kept_by_the_process_without_a_cache(self):
+        with self.settings(CACHES=DUMMY_CACHES,
+                           NEGATIVE_RESULT_CACHE_ALIAS='dummy'):
+            generation = unmapped_paths.get_generation()
+            self.assertEqual(unmapped_paths.get_generation(), generation)
+
+            unmapped_paths.invalidate()
+            self.assertNotEqual(unmapped_paths.get_generation(), generation)
+
+
+class AccessMatrixTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.role = Role(name='driver').save()
+        transaction = Transaction.objects.create(name='vehicles',
+                                                 paths=['vehicle-list'])
+        RoleMembership.objects.create(role=self.role, transaction=transaction)
+        self.create_permission('vehicles')
+        for index in range(3):
+            self.role.user_set.add(self.create_user('driver{}'.format(index)))
+        self.create_user('guest')
+
+    def iter_access_matrix(self, **kwargs):
+        """Returns the rows and the number of evaluated combinations."""
+        with mock.patch.object(matrix, 'is_user_permitted',
+                               wraps=is_user_permitted) as evaluate:
+            rows = list(matrix.iter_access_matrix(methods=['get'], **kwargs))
+        return rows, evaluate.call_count
+
+    def test_users_with_the_same_roles_are_evaluated_once(self):
+        rows, evaluated = self.iter_access_matrix()
+        self.assertEqual(len(rows), 4)
+        # the drivers and the guest are the two distinct role sets
+        self.assertEqual(evaluated, 2)
+        for row in rows:
+            user = self.User.objects.get(pk=row['user_id'])
+            self.assertEqual(
+                (row['is_permitted'], row['is_in_tree']),
+                is_user_permitted(user, 'driver', 'vehicle-list', 'get')
+            )
+
+    def test_kept_role_sets_are_bounded(self):
+        rows, evaluated = self.iter_access_matrix(max_role_sets=0)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(evaluated, 4)
+
+    def test_users_are_fetched_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(matrix.iter_user_chunks(chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 1])
+        # a query and a prefetch for each chunk and the empty last query
+        self.assertEqual(len(queries), 5)
+
+        progress = mock.Mock()
+        self.iter_access_matrix(chunk_size=3, progress=progress)
+        self.assertEqual(progress.call_args_list,
+                         [mock.call(3, 4), mock.call(4, 4)])
+
+    def test_write_access_matrix(self):
+        for output_format in ('csv', 'jsonl'):
+            stream = StringIO()
+            row_count = matrix.write_access_matrix(
+                stream, output_format=output_format, methods=['get']
+            )
+            stream.seek(0)
+            if output_format == 'csv':
+                rows = list(csv.DictReader(stream))
+            else:
+                rows = [json.loads(line) for line in stream]
+
+            with self.subTest(output_format=output_format):
+                self.assertEqual(row_count, 4)
+                self.assertEqual(len(rows), 4)
+                self.assertEqual(set(rows[0]),
+                                 set(matrix.ACCESS_MATRIX_FIELDS))
+                self.assertEqual(rows[0]['url_name'], 'vehicle-list')
+
+        with self.assertRaises(ValueError):
+            matrix.write_access_matrix(StringIO(), output_format='xml')
+
+    def test_command_lowers_the_methods(self):
+        stdout = StringIO()
+        call_command('rbac_access_matrix', '--format', 'jsonl',
+                     '--method', 'GET', stdout=stdout, stderr=StringIO())
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row['method'] for row in rows}, {'get'})
+
+
+class ReverseLookupTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.transaction = Transaction.objects.create(
+            name='vehicles',
+            paths=['vehicle-list'],
+            rules={'vehicle-list': {'read': ['driver']}}
+        )
+        self.create_permission('vehicles')
+        self.parent = None
+        self.add_roles(1)
+
+    def add_roles(self, count):
+        """Adds a chain of child roles, each with a membership and users."""
+        for index in range(count):
+            name = 'driver' if self.parent is None else 'driver{}'.format(
+                Role.objects.count())
+            role = Role(name=name, parent=self.parent).save()
+            RoleMembership.objects.create(role=role,
+                                          transaction=self.transaction)
+            for user_index in range(2):
+                role.user_set.add(
+                    self.create_user('{}-{}'.format(name, user_index))
+                )
+            self.parent = role
+
+    def lookup(self):
+        return (
+            set(get_permitted_users('vehicle-list', 'get', 'driver')),
+            set(get_permitted_roles('vehicle-list', 'get', 'driver')),
+        )
+
+    def test_queries_dont_grow_with_users_and_roles(self):
+        with CaptureQueriesContext(connection) as queries:
+            users, roles = self.lookup()
+        self.assertEqual(len(users), 2)
+        self.assertEqual(len(roles), 1)
+
+        self.add_roles(5)
+        with self.assertNumQueries(len(queries)):
+            users, roles = self.lookup()
+        # the child roles are senior to the allowed driver role
+        self.assertEqual(len(users), 12)
+        self.assertEqual(len(roles), 6)
+        for user in users:
+            self.assertEqual(
+                is_user_permitted(user, 'driver', 'vehicle-list', 'get'),
+                (True, True)
+            )
+
+
+class RoleTreeTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        # a chain of six roles, where each role is the child of the previous
+        role = None
+        self.role_names = []
+        for index in range(6):
+            role = Role(name='role{}'.format(index), parent=role).save()
+            self.role_names.append(role.name)
+        self.user = self.create_user('senior')
+        role.user_set.add(self.user)
+        transaction = Transaction.objects.create(
+            name='vehicles',
+            paths=['vehicle-list'],
+            rules={'vehicle-list': {'read': self.role_names}}
+        )
+        RoleMembership.objects.create(role=role, transaction=transaction)
+        self.create_permission('vehicles')
+
+    def test_parents_are_read_once_per_role(self):
+        is_user_permitted(self.user, 'role0', 'vehicle-list', 'get')
+        # the tree check and the permission check each read the user's
+        # roles and their five parents, whichever allowed role is checked,
+        # besides the transaction, the permission and the membership
+        with self.assertNumQueries(15):
+            self.assertEqual(
+                is_user_permitted(self.user, 'role0', 'vehicle-list', 'get'),
+                (True, True)
+            )
+
+
+@skipUnless(REPLICA_DATABASE, 'The routing tests need a second database.')
+@override_settings(GRANT_NONEXISTENT_PATH_ACCESS=False)
+class PolicyRoutingTests(RbacTestCase):
+    """
+    The policy is created on the default database only, so the checks
+    reading the empty replica deny the access.
+    """
+
+    multi_db = True
+
+    def setUp(self):
+        super().setUp()
+        # the parents of the role are read from the database of the check
+        self.role = Role(name='driver',
+                         parent=Role(name='staff').save()).save()
+        self.user = self.create_user('driver')
+        self.role.user_set.add(self.user)
+        transaction = Transaction.objects.create(
+            name='vehicles',
+            paths=['vehicle-list'],
+            rules={'vehicle-list': {'read': ['driver']}}
+        )
+        RoleMembership.objects.create(role=self.role, transaction=transaction)
+        self.create_permission('vehicles')
+
+    def assertCheckReads(self, database, expected):
+        """Asserts that a check reads the policy from the database only."""
+        other_database = (REPLICA_DATABASE if database == DEFAULT_DB_ALIAS
+                          else DEFAULT_DB_ALIAS)
+        with CaptureQueriesContext(connections[database]) as queries, \
+                self.assertNumQueries(0, using=other_database):
+            self.assertEqual(
+                is_user_permitted(self.user, 'driver', 'vehicle-list', 'get'),
+                expected
+            )
+        self.assertTrue(queries)
+
+    def end_sticky_window(self):
+        get_policy_routing_cache().delete(POLICY_CHANGED_CACHE_KEY)
+
+    def assertRoutesToReplicaUntilChanged(self):
+        self.end_sticky_window()
+        self.assertCheckReads(REPLICA_DATABASE, (False, False))
+
+        # the written policy is read back from the primary database
+        self.role.user_set.add(self.create_user('dispatcher'))
+        self.assertCheckReads(DEFAULT_DB_ALIAS, (True, True))
+
+        self.end_sticky_window()
+        self.assertCheckReads(REPLICA_DATABASE, (False, False))
+
+    def test_read_database(self):
+        with self.settings(POLICY_READ_DATABASE=REPLICA_DATABASE):
+            self.assertRoutesToReplicaUntilChanged()
+
+    def test_router_hints(self):
+        router = 'rbac_permissions.tests.PolicyReplicaRouter'
+        with self.settings(POLICY_ROUTER_HINTS=True,
+                           DATABASE_ROUTERS=[router]):
+            self.assertRoutesToReplicaUntilChanged()
+
+    def test_routing_is_decided_once_per_check(self):
+        patched = mock.patch(
+            'rbac_permissions.routing.is_policy_recently_changed',
+            return_value=True
+        )
+        with self.settings(POLICY_READ_DATABASE=REPLICA_DATABASE), \
+                patched as is_recently_changed:
+            self.assertEqual(
+                is_user_permitted(self.user, 'driver', 'vehicle-list', 'get'),
+                (True, True)
+            )
+        self.assertEqual(is_recently_changed.call_count, 1)
+
+
+class DifferentialCheckTests(RbacTestCase):
+    def make_order_dependent_policy(self, role_names):
+        """
+        The first role has a rule denying order-list, while the second role
+        has a membership of another Transaction with the same name, which
+        has no rule for it.
+        """
+        rules = {'auditor': {'order-list': {'read': []}}, 'clerk': {}}
+        return {
+            'roles': [{'name': name, 'parent': None} for name in role_names],
+            'groups': [],
+            'transactions': [
+                {'key': name, 'name': 'orders', 'paths': ['order-list'],
+                 'rules': rules[name], 'has_permission': True}
+                for name in role_names
+            ],
+            'memberships': [[name, name] for name in role_names],
+            'users': [{'username': 'user', 'roles': role_names,
+                       'groups': [], 'is_superuser': False}],
+            'requests': [['user', 'clerk', 'order-list', 'get']],
+            'grant_nonexistent_path_access': False,
+        }
+
+    def test_last_rule_of_the_user_groups_decides(self):
+        role_names = ['auditor', 'clerk']
+        auditor, clerk = [Role(name=name).save() for name in role_names]
+        user = self.create_user('user')
+        user.groups.set([auditor, clerk])
+        for role, rules in ((auditor, {'order-list': {'read': []}}),
+                            (clerk, {})):
+            RoleMembership.objects.create(
+                role=role,
+                transaction=Transaction.objects.create(
+                    name='orders', paths=['order-list'], rules=rules
+                )
+            )
+        self.create_permission('orders')
+
+        # the clerk membership without a rule comes last and grants
+        self.assertEqual(
+            is_user_permitted(user, 'clerk', 'order-list', 'get'),
+            (True, True)
+        )
+
+    def test_order_dependent_decision_is_a_mismatch(self):
+        self.assertEqual(
+            find_mismatches(
+                self.make_order_dependent_policy(['auditor', 'clerk']),
+                DEFAULT_ENGINES
+            ),
+            []
+        )
+        # the auditor rule comes last and denies, unlike the reverse lookup
+        self.assertEqual(
+            find_mismatches(
+                self.make_order_dependent_policy(['clerk', 'auditor']),
+                DEFAULT_ENGINES
+            ),
+            [('reverse_lookup', ['user', 'clerk', 'order-list', 'get'],
+              False, True)]
+        )
+
+    def test_shared_transaction_names_are_reported(self):
+        [(engine_name, policy, mismatches)] = run_differential_check(
+            examples=100, seed=17
+        )
+        self.assertEqual(engine_name, 'reverse_lookup')
+        self.assertEqual(len(mismatches), 1)
+        # the order of the user's groups decides between the two
+        # memberships of the same permission
+        [first, second] = policy['transactions']
+        self.assertEqual(first['name'], second['name'])
+
+    def test_engines_agree_with_is_user_permitted(self):
+        self.assertEqual(
+            run_differential_check(examples=100, seed=0,
+                                   share_transaction_names=False),
+            []
+        )
+
+    def test_disagreement_is_shrunk(self):
+        engines = {'grant_all': lambda *args: True}
+        [(engine_name, policy, mismatches)] = run_differential_check(
+            engines, examples=10, seed=0
+        )
+        self.assertEqual(engine_name, 'grant_all')
+        self.assertEqual(len(policy['requests']), 1)
+        self.assertEqual(len(mismatches), 1)
+
+
+@rbac_test_settings
+class LoadTestTests(TransactionTestCase):
+    """The worker threads read the committed policy with own connections."""
+
+    @staticmethod
+    def read_uncommitted(sender, connection, **kwargs):
+        # the connections of an in-memory SQLite test database share its
+        # cache, in which the reads would lock the tables for the writes
+        if connection.vendor == 'sqlite':
+            connection.cursor().execute('PRAGMA read_uncommitted = 1')
+
+    def setUp(self):
+        caches['default'].clear()
+        connection_created.connect(self.read_uncommitted)
+        self.addCleanup(connection_created.disconnect, self.read_uncommitted)
+        role = Role(name='driver').save()
+        User = get_user_model()
+        self.user_ids = []
+        for index in range(2):
+            user = User.objects.create(
+                **{User.USERNAME_FIELD: 'driver{}'.format(index)}
+            )
+            role.user_set.add(user)
+            self.user_ids.append(user.pk)
+        self.rules = {'vehicle-list': {'read': ['driver']}}
+        transaction = Transaction.objects.create(
+            name='vehicles', paths=['vehicle-list'], rules=self.rules
+        )
+        RoleMembership.objects.create(role=role, transaction=transaction)
+        Permission.objects.create(
+            codename='vehicles', name='vehicles',
+            content_type=ContentType.objects.get_for_model(Transaction)
+        )
+
+    def test_threads_with_policy_writes(self):
+        scenarios = [('group_permission', 'vehicle-list', method, ['driver'])
+                     for method in ('get', 'post')]
+        report = loadtest.run_load_test(
+            request_count=100, concurrency=2, mode='threads',
+            write_interval=0.001, scenarios=scenarios,
+            user_ids=self.user_ids, seed=0
+        )
+
+        self.assertEqual(report['requests'], 100)
+        self.assertEqual(report['errors'], {})
+        self.assertGreater(report['policy_writes'], 0)
+        # the scratch policy is deleted and the existing one is not written
+        prefix = loadtest.LOAD_TEST_NAME_PREFIX
+        self.assertFalse(
+            Transaction.objects.filter(name__startswith=prefix).exists()
+        )
+        self.assertFalse(
+            Permission.objects.filter(codename__startswith=prefix).exists()
+        )
+        self.assertEqual(Transaction.objects.get().rules, self.rules)
+
+    def test_failed_checks_are_left_out_of_the_latencies(self):
+        scenarios = [('group_permission', 'vehicle-list', 'get', ['driver'])]
+        with mock.patch.dict(loadtest.LOAD_TEST_CHECKS,
+                             group_permission=mock.Mock(
+                                 side_effect=[True, KeyError] * 5)):
+            report = loadtest.run_worker(self.user_ids, scenarios, 10,
+                                         seed=0, verify=False)
+        self.assertEqual(len(report['latencies']), 5)
+        self.assertEqual(report['errors'], {'KeyError': 5})
+
+
+@override_settings(ENFORCED_URL_NAMESPACES=['api'])
+class RoleAuthorizationMiddlewareTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.middleware = CheckRoleAuthorizationMiddleware()
+        role = Role(name='driver').save()
+        self.driver = self.create_user('driver')
+        role.user_set.add(self.driver)
+        self.guest = self.create_user('guest')
+        transaction = Transaction.objects.create(
+            name='vehicles',
+            paths=['vehicle-list'],
+            rules={'vehicle-list': {'read': ['driver']}}
+        )
+        RoleMembership.objects.create(role=role, transaction=transaction)
+        self.create_permission('vehicles')
+
+    def process_view(self, user, url_name, method='get', namespace='api'):
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user
+        request.resolver_match = ResolverMatch(
+            lambda request: None, (), {}, url_name=url_name,
+            namespaces=[namespace] if namespace else []
+        )
+        return self.middleware.process_view(request, None, (), {})
+
+    def test_other_namespaces_pass_through(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(
+                self.process_view(self.guest, 'vehicle-list', namespace='')
+            )
+
+    def test_denied_requests(self):
+        self.assertIsNone(self.process_view(self.driver, 'vehicle-list'))
+        for user, method in ((self.guest, 'get'), (self.driver, 'post')):
+            with self.subTest(user=user, method=method), \
+                    self.assertRaises(PermissionDenied):
+                self.process_view(user, 'vehicle-list', method)
+
+    def test_url_names_are_matched_as_in_is_user_permitted(self):
+        # 'vehicle' is contained by the 'vehicle-list' path
+        with self.assertRaises(PermissionDenied):
+            self.process_view(self.guest, 'vehicle')
+        self.assertEqual(
+            is_user_permitted(self.guest, 'driver', 'vehicle', 'get'),
+            (False, False)
+        )
+
+    def test_url_names_without_a_transaction_make_no_queries(self):
+        for alias in ('default', 'dummy'):
+            with self.subTest(alias=alias), \
+                    self.settings(CACHES=DUMMY_CACHES,
+                                  NEGATIVE_RESULT_CACHE_ALIAS=alias):
+                self.process_view(self.guest, 'order-list')
+                with self.assertNumQueries(0):
+                    self.assertIsNone(
+                        self.process_view(self.guest, 'order-list')
+                    )
+
+    def test_saved_transaction_is_compiled_again(self):
+        self.assertIsNone(self.process_view(self.guest, 'order-list'))
+
+        Transaction.objects.create(name='orders', paths=['order-list'],
+                                   rules={'order-list': {'read': []}})
+        self.create_permission('orders')
+        with self.assertRaises(PermissionDenied):
+            self.process_view(self.guest, 'order-list')
+
+
+class WarmUpTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        self.startup_timings = apps.get_app_config(
+            'rbac_permissions').startup_timings
+        self.startup_timings.pop('warm_up', None)
+
+    @override_settings(POLICY_WARM_UP='first_request')
+    def test_first_request_warms_up_once(self):
+        with mock.patch.object(warmup, 'is_warm_up_started', False), \
+                mock.patch.object(warmup, 'warm_up') as warm_up:
+            warmup.warm_up_on_first_request(None)
+            warmup.warm_up_on_first_request(None)
+        warm_up.assert_called_once_with(close_connections=False)
+
+    def test_warm_up(self):
+        self.assertTrue(warmup.warm_up(close_connections=False))
+        self.assertIn('warm_up', self.startup_timings)
+
+    def test_settings_validation_is_timed(self):
+        self.assertIn('settings_validation', self.startup_timings)
+        self.assertNotIn('ready', self.startup_timings)
+
+    def test_url_names_are_collected_once(self):
+        url_names = warmup.get_all_urls_with_names()
+        self.assertIn('rbac_permissions_role_change', url_names)
+        with mock.patch('rbac_permissions.helpers.collect_url_names') as \
+                collect_url_names:
+            self.assertEqual(warmup.get_all_urls_with_names(), url_names)
+        collect_url_names.assert_not_called()
+
+    def test_unavailable_cache_does_not_fail_the_warm_up(self):
+        with mock.patch.object(unmapped_paths, 'get_generation',
+                               side_effect=ConnectionError), \
+                self.assertLogs(warmup.logger, 'WARNING'):
+            self.assertFalse(warmup.warm_up(close_connections=False))
+
+
+class DecoratorSettingsTests(TestCase):
+    @override_settings(PERMISSION_DENIED_URL='denied')
+    def test_module_settings_are_read_lazily(self):
+        self.assertEqual(decorators.PERMISSION_DENIED_URL, 'denied')
+        self.assertEqual(decorators.HTTP_FORBIDDEN_MESSAGE,
+                         decorators.DEFAULT_HTTP_FORBIDDEN_MESSAGE)
+
+
+class RequestMethodOperationsTests(RbacTestCase):
+    def setUp(self):
+        super().setUp()
+        role = Role(name='driver').save()
+        self.user = self.create_user('driver')
+        role.user_set.add(self.user)
+        transaction = Transaction.objects.create(
+            name='vehicles',
+            paths=['vehicle-list'],
+            rules={'vehicle-list': {'read': ['driver'], 'update': [],
+                                    'delete': ['driver']}}
+        )
+        RoleMembership.objects.create(role=role, transaction=transaction)
+        self.create_permission('vehicles')
+
+    def assertPermitted(self, method, expected):
+        self.assertEqual(
+            is_user_permitted(self.user, 'driver', 'vehicle-list', method),
+            (expected, True)
+        )
+
+    def test_default_operations(self):
+        operations = get_request_method_operations()
+        self.assertEqual(operations['head'], 'read')
+        self.assertEqual(operations['patch'], 'update')
+        # HEAD is checked against the read rule, PATCH against the update
+        self.assertPermitted('head', True)
+        self.assertPermitted('patch', False)
+
+    @override_settings(REQUEST_METHOD_OPERATIONS={'PURGE': 'delete',
+                                                  'head': None})
+    def test_custom_and_removed_operations(self):
+        operations = get_request_method_operations()
+        self.assertEqual(operations['purge'], 'delete')
+        self.assertNotIn('head', operations)
+        self.assertPermitted('purge', True)
+        # a method without an operation is not granted by any rule
+        self.assertPermitted('head', False)
+
+    def test_invalid_operations(self):
+        for method_operations in (['get'], {'': 'read'}, {1: 'read'},
+                                  {'get': ''}, {'get': ['read']}):
+            with self.subTest(method_operations=method_operations), \
+                    self.settings(
+                        REQUEST_METHOD_OPERATIONS=method_operations), \
+                    self.assertRaises(ImproperlyConfigured):
+                get_request_method_operations()
+
+
+class UncheckedRequestMethodsTests(TestCase):
+    @override_settings(UNCHECKED_REQUEST_METHODS=['OPTIONS', 'Trace'])
+    def test_methods_are_lowered(self):
+        self.assertEqual(get_unchecked_request_methods(),
+                         frozenset(['options', 'trace']))
+        self.assertTrue(is_unchecked_method('options'))
+        self.assertFalse(is_unchecked_method('opt'))
+
+    def test_unchecked_requests_make_no_queries(self):
+        User = get_user_model()
+        user = User.objects.create(**{User.USERNAME_FIELD: 'guest'})
+        request = loadtest.make_request(user, 'vehicle-list', 'options')
+        for check in (loadtest.check_group_permission,
+                      loadtest.check_user_groups_required):
+            with self.subTest(check=check.__name__), \
+                    self.assertNumQueries(0):
+                self.assertTrue(check(request, ['driver']))
+
+    def test_invalid_methods(self):
+        for methods in ('options', ['options', ''], [None]):
+            with self.subTest(methods=methods), \
+                    self.settings(UNCHECKED_REQUEST_METHODS=methods), \
+                    self.assertRaises(ImproperlyConfigured):
+                get_unchecked_request_methods()
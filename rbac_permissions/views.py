@@ -1,6 +1,72 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.generic import View
 
-# Create your views here.
+from .constants import DEFAULT_AUTOCOMPLETE_PAGE_SIZE
+
+
+class AutocompleteJsonView(View):
+    """
+    Serves a single page of autocomplete results for the admin widgets.
+
+    The results are either taken from a queryset, filtered by the given
+    search fields, or from a callable returning a list of names.
+    """
+
+    model_admin = None
+    queryset = None
+    search_fields = ()
+    choices = None
+
+    def get(self, request, *args, **kwargs):
+        if not self.model_admin.has_change_permission(request):
+            raise PermissionDenied
+
+        page_size = getattr(settings, 'AUTOCOMPLETE_PAGE_SIZE',
+                            DEFAULT_AUTOCOMPLETE_PAGE_SIZE)
+        term = request.GET.get('term', '').strip()
+        paginator = Paginator(self.get_results(term), page_size)
+
+        try:
+            page = paginator.page(request.GET.get('page', 1))
+        except InvalidPage:
+            return JsonResponse({'results': [], 'pagination': {'more': False}})
+
+        return JsonResponse({
+            'results': [self.serialize(obj) for obj in page.object_list],
+            'pagination': {'more': page.has_next()},
+        })
+
+    def get_results(self, term):
+        """
+        Filters the available results by the search term.
+
+        Args:
+            term (str): the search term entered in the widget.
+
+        Returns:
+            (QuerySet or list): the matching objects or names.
+        """
+
+        if self.choices is not None:
+            term = term.lower()
+            return [name for name in self.choices() if term in name.lower()]
+
+        queryset = self.queryset.all()
+        if term:
+            lookup = Q()
+            for field_name in self.search_fields:
+                lookup |= Q(**{'{}__icontains'.format(field_name): term})
+            queryset = queryset.filter(lookup)
+        return queryset.order_by('pk')
+
+    def serialize(self, obj):
+        if self.choices is not None:
+            return {'id': obj, 'text': obj}
+        return {'id': str(obj.pk), 'text': str(obj)}
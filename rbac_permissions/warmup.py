@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from .constants import DEFAULT_POLICY_WARM_UP
+from .helpers import get_all_urls_with_names, get_compiled_transactions
+
+
+logger = logging.getLogger(__name__)
+
+# the first request of the process starts the warm up
+is_warm_up_started = False
+warm_up_lock = threading.Lock()
+
+
+def warm_up(close_connections=True):
+    """
+    Loads the url registry and the compiled policy structures, so that the
+    requests do not pay for them.
+
+    Call it from the pre-fork hook of your server (e.g. in wsgi.py with the
+    preload_app option of gunicorn), so that the workers are forked warm.
+    The database connections are closed afterwards, so that the workers do
+    not share its connections.
+
+    Args:
+        close_connections (bool): whether to close the database connections
+                                  of the current thread afterwards.
+
+    Returns:
+        (bool): True if the policy structures could be loaded.
+    """
+
+    started_at = time.perf_counter()
+    is_warmed_up = True
+
+    try:
+        get_all_urls_with_names()
+        get_compiled_transactions()
+    except Exception:
+        # e.g. the tables don't exist yet before the first migration or
+        # the cache backend is down, the requests load them later anyway
+        logger.warning('Could not warm up the RBAC policy.', exc_info=True)
+        is_warmed_up = False
+    finally:
+        if close_connections:
+            connections.close_all()
+
+    duration = time.perf_counter() - started_at
+    app_config = apps.get_app_config('rbac_permissions')
+    app_config.startup_timings['warm_up'] = duration
+    logger.info('Warmed up the RBAC policy in %.3f seconds.', duration)
+    return is_warmed_up
+
+
+def warm_up_in_background():
+    """
+    Runs warm_up in a daemon thread.
+
+    Returns:
+        (Thread): the started thread.
+    """
+
+    thread = threading.Thread(target=warm_up, name='rbac-permissions-warm-up')
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def warm_up_on_first_request(sender, **kwargs):
+    """
+    A request_started receiver, which warms up the policy on the first
+    request of the process as configured by POLICY_WARM_UP.
+    """
+
+    global is_warm_up_started
+
+    with warm_up_lock:
+        if is_warm_up_started:
+            return
+        is_warm_up_started = True
+
+    POLICY_WARM_UP = getattr(settings, 'POLICY_WARM_UP',
+                             DEFAULT_POLICY_WARM_UP)
+    if POLICY_WARM_UP == 'background':
+        warm_up_in_background()
+    else:
+        # the connections are kept for the request
+        warm_up(close_connections=False)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django import forms
+from django.apps import apps
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.urls import NoReverseMatch, reverse
+from django.utils.encoding import force_text
+from django.utils.text import Truncator
+
+from .constants import DJANGO_JSON_WIDGET
+
+
+def get_json_editor_widget():
+    """
+    Gets the JSON editor widget of django_json_widget, if it is installed.
+    The package is only imported on the first call.
+
+    Returns:
+        (class): the widget class, or Textarea as a fallback.
+    """
+
+    if not apps.is_installed(DJANGO_JSON_WIDGET):
+        return forms.Textarea
+
+    try:
+        from django_json_widget.widgets import JSONEditorWidget
+    except ImportError:
+        return forms.Textarea
+    return JSONEditorWidget
+
+
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """
+    A select box, which renders only the selected options.
+
+    The remaining choices are fetched page by page from the autocomplete view
+    named url_name, so the size of the rendered page does not depend on the
+    number of available choices.
+    """
+
+    class Media:
+        js = ('rbac_permissions/js/autocomplete.js', )
+        css = {'all': ('rbac_permissions/css/autocomplete.css', )}
+
+    def __init__(self, url_name, attrs=None, choices=()):
+        super().__init__(attrs, choices)
+        self.url_name = url_name
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        attrs['class'] = ' '.join(
+            filter(None, [attrs.get('class'), 'rbac-autocomplete'])
+        )
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Build the option groups only for the selected values."""
+        selected_values = {force_text(v) for v in value if v not in ('', None)}
+        if not selected_values:
+            return []
+
+        # for model choices, only fetch the selected objects
+        queryset = getattr(self.choices, 'queryset', None)
+        if queryset is not None:
+            choices = (self.choices.choice(obj) for obj in
+                       queryset.filter(pk__in=selected_values))
+        else:
+            choices = (choice for choice in self.choices
+                       if force_text(choice[0]) in selected_values)
+
+        return [
+            (None, [self.create_option(name, option_value, option_label,
+                                       True, index, attrs=attrs)], index)
+            for index, (option_value, option_label) in enumerate(choices)
+        ]
+
+
+class PreloadedForeignKeyRawIdWidget(ForeignKeyRawIdWidget):
+    """
+    A raw id widget, which labels its value with an already loaded related
+    object instead of fetching it from the database for every rendered form.
+    """
+
+    related_object = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.related_object
+        if obj is None or force_text(obj.pk) != force_text(value):
+            return super().label_and_url_for_value(value)
+
+        try:
+            url = reverse(
+                '%s:%s_%s_change' % (
+                    self.admin_site.name,
+                    obj._meta.app_label,
+                    obj._meta.object_name.lower(),
+                ),
+                args=(obj.pk,)
+            )
+        except NoReverseMatch:
+            url = ''
+
+        return Truncator(obj).words(14, truncate='...'), url